@@ -0,0 +1,278 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from build_graph import BuildGraph
+from generate_subs import generate_ass_subtitles
+from clip_cache import ClipCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from image_prep import prepare_images
+from make_video import (CLIP_BACKENDS, RenderOptions, encode_video, find_images, generate_clip_commands,
+                        get_audio_duration, get_output_path, needed_image_height, needs_transcription,
+                        subtitles_fingerprint, video_fingerprint)
+from render_profiles import PROFILES, DEFAULT_PROFILE, get_profile
+
+def total_memory_gb():
+    """Physical memory of this machine in GB"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3
+    except (ValueError, OSError, AttributeError):
+        return 16.0
+
+class ResourcePool:
+    """Shared CPU and memory budget with a concurrency limit per stage type.
+
+    A stage blocks in acquire() until its stage type is under its limit and
+    enough CPUs and memory are free. A single request larger than the whole
+    budget is clamped to it, so it runs alone instead of waiting forever.
+    """
+
+    def __init__(self, cpus, memory_gb, stage_limits):
+        self.total_cpus = cpus
+        self.total_memory_gb = memory_gb
+        self.free_cpus = cpus
+        self.free_memory_gb = memory_gb
+        self.stage_limits = stage_limits
+        self.running = Counter()
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def acquire(self, stage, cpus, memory_gb):
+        cpus = min(cpus, self.total_cpus)
+        memory_gb = min(memory_gb, self.total_memory_gb)
+        with self._cond:
+            self._cond.wait_for(lambda: self.running[stage] < self.stage_limits[stage]
+                                and self.free_cpus >= cpus
+                                and self.free_memory_gb >= memory_gb)
+            self.running[stage] += 1
+            self.free_cpus -= cpus
+            self.free_memory_gb -= memory_gb
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.running[stage] -= 1
+                self.free_cpus += cpus
+                self.free_memory_gb += memory_gb
+                self._cond.notify_all()
+
+def natural_key(path):
+    """Sort key that puts episode folder 9 before 10"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', path)]
+
+def discover_projects(source):
+    """Project folders from a root directory or a manifest file.
+
+    A root directory yields every subfolder that has an audio.mp3. A
+    manifest is either a JSON list of folders or a text file with one folder
+    per line ('#' starts a comment); relative entries are resolved against
+    the manifest's directory.
+    """
+    if os.path.isdir(source):
+        folders = [os.path.join(source, name) for name in os.listdir(source)
+                   if os.path.isfile(os.path.join(source, name, "audio.mp3"))]
+        return sorted(folders, key=natural_key)
+
+    with open(source, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if source.endswith(".json"):
+        entries = json.loads(content)
+    else:
+        entries = [line.split('#', 1)[0].strip() for line in content.splitlines()]
+        entries = [entry for entry in entries if entry]
+    base = os.path.dirname(os.path.abspath(source))
+    return [os.path.join(base, entry) for entry in entries]
+
+class BatchRenderer:
+    """Run every project's stages concurrently over one ResourcePool.
+
+    `options` is a make_video.RenderOptions; its `jobs` is the number of
+    clips rendered in parallel within one project.
+    """
+
+    def __init__(self, pool, options=None, asr_workers=1, transcribe="missing", costs=None):
+        self.pool = pool
+        self.options = options or RenderOptions(jobs=4)
+        self.asr_workers = asr_workers
+        self.transcribe = transcribe
+        clip_jobs = self.options.jobs or os.cpu_count() or 1
+        # (cpus, memory GB) each stage reserves while it runs
+        self.costs = costs or {
+            "transcribe": (asr_workers, 4.0 * asr_workers),
+            "images": (clip_jobs, 1.0 * clip_jobs),
+            "clips": (clip_jobs, 1.0 * clip_jobs),
+            "encode": (4, 2.0),
+        }
+
+    def run_stage(self, result, stage, func, *args, **kwargs):
+        cpus, memory_gb = self.costs[stage]
+        with self.pool.acquire(stage, cpus, memory_gb):
+            print(f"▶️  [{result['folder']}] {stage}")
+            start = time.perf_counter()
+            value = func(*args, **kwargs)
+            result["stages"][stage] = round(time.perf_counter() - start, 2)
+            print(f"✅ [{result['folder']}] {stage} done in {result['stages'][stage]:.1f}s")
+        return value
+
+    def render_project(self, folder_path):
+        """All stages of one project. Never raises: failures land in the result.
+
+        Like make_video.py's full mode, the project's build manifest decides
+        what runs: subtitles and video are rebuilt only when their inputs
+        changed, so an unchanged project takes no stage at all.
+        """
+        result = {"folder": folder_path, "status": "ok", "stages": {}, "error": None, "built": []}
+        start = time.perf_counter()
+        try:
+            images = find_images(folder_path)
+            audio_path = os.path.join(folder_path, "audio.mp3")
+            ass_path = os.path.join(folder_path, "subtitles.ass")
+            txt_path = os.path.join(folder_path, "subtitles.txt")
+            output_path = get_output_path(folder_path)
+            if not images:
+                raise ValueError(f"No image files found in {folder_path}")
+            if not os.path.exists(audio_path):
+                raise ValueError(f"Audio file not found: {audio_path}")
+
+            graph = BuildGraph(folder_path, self.options.force)
+            subs_fingerprint = subtitles_fingerprint(graph, audio_path)
+            if self.transcribe == "always" or (self.transcribe == "missing"
+                                               and needs_transcription(graph, subs_fingerprint, ass_path, txt_path)):
+                self.run_stage(result, "transcribe", generate_ass_subtitles, audio_path, ass_path,
+                               workers=self.asr_workers)
+                graph.record("subtitles", subs_fingerprint, [ass_path, txt_path])
+                result["built"].append("subtitles")
+            elif not os.path.exists(ass_path):
+                raise ValueError(f"Subtitle file not found: {ass_path}")
+
+            # Same fingerprint as make_video.py --mode video, so either tool skips the other's up-to-date video
+            fingerprint = video_fingerprint(graph, images, audio_path, ass_path, self.options)
+            if graph.step("video", fingerprint, [output_path], self.render_stages, result, folder_path, images,
+                          audio_path, ass_path, output_path):
+                result["built"].append("video")
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+            print(f"❌ [{folder_path}] {e}")
+            traceback.print_exc()
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        return result
+
+    def render_stages(self, result, folder_path, images, audio_path, ass_path, output_path):
+        """Image prep, clips and final encode of one project, each under the pool's limits"""
+        options = self.options
+        temp_dir = os.path.join(folder_path, "temp_clips")
+        if options.prep_images:
+            # Same decoded, oriented and downscaled copies as make_video.py renders from
+            target_height = needed_image_height(get_profile(options.profile), options.single_pass)
+            images = self.run_stage(result, "images", prepare_images, images, target_height, options.jobs)
+        per_image_duration = get_audio_duration(audio_path) / len(images)
+        clips = None
+        if not options.single_pass:
+            os.makedirs(temp_dir, exist_ok=True)
+            clips = self.run_stage(result, "clips", generate_clip_commands, images, per_image_duration, temp_dir,
+                                   jobs=options.jobs, cache=options.cache, backend=options.backend,
+                                   profile=options.profile)
+        self.run_stage(result, "encode", encode_video, images, clips, per_image_duration, audio_path, ass_path,
+                       output_path, profile=options.profile)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def run(self, folders, max_projects=None):
+        """Render all folders, keeping up to max_projects pipelines in flight"""
+        if max_projects is None:
+            max_projects = sum(self.pool.stage_limits.values()) + 1
+        results = [None] * len(folders)
+        next_index = iter(range(len(folders)))
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    i = next(next_index, None)
+                if i is None:
+                    return
+                results[i] = self.render_project(folders[i])
+
+        threads = [threading.Thread(target=worker) for _ in range(min(max_projects, len(folders)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+def print_summary(results):
+    failed = [r for r in results if r["status"] != "ok"]
+    print(f"\n📊 Batch summary: {len(results) - len(failed)} succeeded, {len(failed)} failed")
+    for r in results:
+        mark = "✅" if r["status"] == "ok" else "❌"
+        line = f"{mark} {r['folder']} ({r['seconds']:.1f}s)"
+        if r["status"] == "ok" and not r["built"]:
+            line += " up to date"
+        if r["error"]:
+            line += f": {r['error']}"
+        print(line)
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Render many project folders with shared CPU and memory budgets")
+    parser.add_argument("source", help="Root directory of project folders, or a manifest (.txt with one folder per line, or .json list)")
+    parser.add_argument("--cpus", type=int, default=os.cpu_count() or 1, help="CPU budget shared by all stages")
+    parser.add_argument("--memory-gb", type=float, default=total_memory_gb() * 0.8, help="Memory budget shared by all stages")
+    parser.add_argument("--max-transcribe", type=int, default=1, help="Concurrent transcription stages")
+    parser.add_argument("--max-clips", type=int, default=2, help="Concurrent clip rendering stages")
+    parser.add_argument("--max-encode", type=int, default=2, help="Concurrent final encodes")
+    parser.add_argument("--clip-jobs", type=int, default=4, help="Clips rendered in parallel within one project")
+    parser.add_argument("--asr-workers", type=int, default=1, help="Speech recognition processes per transcription")
+    parser.add_argument("--transcribe", choices=["missing", "always", "never"], default="missing",
+                        help="Transcribe folders whose subtitles are missing or out of date with audio.mp3 (default), every folder, or none")
+    parser.add_argument("--backend", choices=sorted(CLIP_BACKENDS), default="manim", help="Clip renderer")
+    parser.add_argument("--single-pass", action="store_true", help="Render each project in a single ffmpeg encode")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE, help="Render profile")
+    parser.add_argument("--no-image-prep", action="store_true",
+                        help="Render from the original images instead of decoded and downscaled copies")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Rendered clip cache directory")
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 3, help="Clip cache size in GB")
+    parser.add_argument("--no-cache", action="store_true", help="Don't use the clip cache")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every project even if its build manifest says it is up to date")
+    parser.add_argument("--summary", help="Write the per-folder results to this JSON file")
+
+    args = parser.parse_args()
+
+    folders = discover_projects(args.source)
+    if not folders:
+        raise ValueError(f"No project folders found in {args.source}")
+    print(f"Found {len(folders)} projects")
+
+    pool = ResourcePool(args.cpus, args.memory_gb, {
+        "transcribe": args.max_transcribe,
+        # Image prep runs a pool of --clip-jobs processes like clip rendering
+        "images": args.max_clips,
+        "clips": args.max_clips,
+        "encode": args.max_encode,
+    })
+    cache = None if args.no_cache else ClipCache(args.cache_dir, int(args.cache_size * 1024 ** 3))
+    options = RenderOptions(
+        jobs=args.clip_jobs,
+        cache=cache,
+        backend=args.backend,
+        single_pass=args.single_pass,
+        profile=args.profile,
+        prep_images=not args.no_image_prep,
+        force=args.force,
+    )
+    renderer = BatchRenderer(pool, options, asr_workers=args.asr_workers, transcribe=args.transcribe)
+    results = renderer.run(folders)
+
+    print_summary(results)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    sys.exit(1 if any(r["status"] != "ok" for r in results) else 0)
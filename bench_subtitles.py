@@ -0,0 +1,42 @@
+import os
+import random
+import resource
+import tempfile
+import time
+
+from instrument import max_rss_mb
+from subtitle_engine import Word, write_subtitles
+
+def synthetic_words(count, seed=0):
+    """Yield a plausible word stream: short words, small gaps, some pauses and sentence ends"""
+    rng = random.Random(seed)
+    vocabulary = ["राम", "सीता", "हनुमान", "लंका", "वन", "कथा", "और", "है", "था।", "क्या?"]
+    t = 0.0
+    for _ in range(count):
+        t += rng.choice((0.05, 0.1, 0.15, 0.8))
+        duration = rng.uniform(0.15, 0.6)
+        yield Word(rng.choice(vocabulary), t, t + duration)
+        t += duration
+
+def run(word_count, formats):
+    with tempfile.TemporaryDirectory() as out_dir:
+        outputs = {fmt: os.path.join(out_dir, f"bench.{fmt}") for fmt in formats}
+        start = time.perf_counter()
+        counts = write_subtitles(synthetic_words(word_count), outputs)
+        elapsed = time.perf_counter() - start
+    events = counts["ass"] if "ass" in counts else sum(counts.values())
+    print(f"{word_count} words -> {events} events in {elapsed:.2f}s "
+          f"({events / elapsed:,.0f} events/s, {word_count / elapsed:,.0f} words/s)")
+    for fmt, count in counts.items():
+        print(f"   {fmt}: {count} events")
+    print(f"   peak RSS: {max_rss_mb(resource.getrusage(resource.RUSAGE_SELF)):.1f} MB")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the streaming subtitle writers on a synthetic transcript")
+    parser.add_argument("--words", type=int, default=100_000, help="Number of synthetic words")
+    parser.add_argument("--formats", default="ass,txt,srt,vtt", help="Comma-separated output formats")
+
+    args = parser.parse_args()
+    run(args.words, args.formats.split(","))
@@ -0,0 +1,473 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import generate_subs
+import make_video
+from instrument import max_rss_mb
+from numpy_ken_burns import compare_with_zoompan, measure_psnr
+from render_profiles import DEFAULT_PROFILE, PROFILES, encoder_args, get_profile, preview_profile, rendition_profile
+
+SAMPLE_RATE = 16000
+
+# ---------------------------------------------------------------------------
+# Synthetic projects
+# ---------------------------------------------------------------------------
+
+def make_image(path, width, height, seed):
+    """A photo-like test image: smooth gradient, shapes and fine noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([
+        127 + 127 * np.sin(x / width * np.pi * rng.uniform(1, 4) + rng.uniform(0, 6)),
+        127 + 127 * np.cos(y / height * np.pi * rng.uniform(1, 4) + rng.uniform(0, 6)),
+        127 + 127 * np.sin((x + y) / (width + height) * np.pi * rng.uniform(1, 4)),
+    ], axis=-1)
+    base += rng.normal(0, 12, base.shape)
+    img = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rng.integers(0, width), rng.integers(0, height)
+        size = int(rng.integers(width // 20, width // 4))
+        draw.ellipse([x0, y0, x0 + size, y0 + size], fill=tuple(int(c) for c in rng.integers(0, 255, 3)))
+    img.save(path, quality=92)
+
+def make_audio(path, seconds, kind="speech", seed=0):
+    """Write an MP3 of a steady tone, or of speech-like bursts separated by pauses"""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    if kind == "tone":
+        t = np.arange(total) / SAMPLE_RATE
+        samples = 0.3 * np.sin(2 * np.pi * 220 * t)
+    else:
+        samples = np.zeros(total)
+        pos = 0
+        while pos < total:
+            # A "word": a pitch-varying harmonic burst with a smooth envelope
+            length = int(rng.uniform(0.15, 0.5) * SAMPLE_RATE)
+            t = np.arange(length) / SAMPLE_RATE
+            pitch = rng.uniform(110, 240)
+            burst = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in (1, 2, 3))
+            burst *= np.hanning(length) * 0.25
+            end = min(total, pos + length)
+            samples[pos:end] = burst[:end - pos]
+            pos = end + int(rng.choice((0.08, 0.12, 0.2, 0.7)) * SAMPLE_RATE)
+    pcm = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+
+    wav_path = path + ".wav"
+    with wave.open(wav_path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm.tobytes())
+    subprocess.run([make_video.FFMPEG, "-y", "-loglevel", "error", "-i", wav_path, path], check=True)
+    os.remove(wav_path)
+
+# Image shapes cycled through unless --uniform-sizes, as (width, height)
+# factors: real episodes mix portrait and landscape photos of odd sizes,
+# which the filter graphs have to accept side by side
+MIXED_SIZES = [(1.0, 1.0), (0.777, 0.8), (1.0, 0.5), (0.8343, 0.9997)]
+
+def make_project(folder, image_count, width, height, seconds, audio_kind="speech", mixed_sizes=True):
+    """Create a project folder with images and audio.mp3 like a real episode"""
+    os.makedirs(folder, exist_ok=True)
+    for i in range(image_count):
+        scale_x, scale_y = MIXED_SIZES[i % len(MIXED_SIZES)] if mixed_sizes else (1.0, 1.0)
+        make_image(os.path.join(folder, f"{i:04d}.jpg"), round(width * scale_x), round(height * scale_y), seed=i)
+    make_audio(os.path.join(folder, "audio.mp3"), seconds, audio_kind)
+    return folder
+
+# ---------------------------------------------------------------------------
+# Offline stand-in for Vosk
+# ---------------------------------------------------------------------------
+
+class StubModel:
+    """Used instead of vosk.Model when no model is available"""
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+
+class StubRecognizer:
+    """Emits one word per loud stretch of audio, with Vosk's result format.
+
+    It does real per-sample work so decode and buffering costs still show up,
+    but it is not a speed proxy for the real recognizer.
+    """
+
+    def __init__(self, model, sample_rate):
+        self.sample_rate = sample_rate
+        self.position = 0
+        self.word_start = None
+        self.words = []
+
+    def SetWords(self, enabled):
+        pass
+
+    def AcceptWaveform(self, data):
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        window = self.sample_rate // 50
+        frames = len(samples) // window
+        rms = np.sqrt(np.mean(samples[:frames * window].reshape(frames, window) ** 2, axis=1))
+        for i, loud in enumerate(rms > 300):
+            t = (self.position + i * window) / self.sample_rate
+            if loud and self.word_start is None:
+                self.word_start = t
+            elif not loud and self.word_start is not None:
+                self.words.append({"conf": 1.0, "start": self.word_start, "end": t,
+                                   "word": f"word{len(self.words)}"})
+                self.word_start = None
+        self.position += len(samples)
+        return len(self.words) >= 8
+
+    def Result(self):
+        words, self.words = self.words, []
+        return json.dumps({"result": words, "text": " ".join(w["word"] for w in words)})
+
+    def FinalResult(self):
+        return self.Result()
+
+def use_stub_recognizer():
+    generate_subs.Model = StubModel
+    generate_subs.KaldiRecognizer = StubRecognizer
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def stage_audio_decode(project, options):
+    total = sum(len(chunk) for chunk in generate_subs.stream_pcm(project["audio"]))
+    return {"pcm_bytes": total}
+
+def stage_transcription(project, options):
+    ass_path = os.path.join(project["folder"], "subtitles.ass")
+    generate_subs.generate_ass_subtitles(project["audio"], ass_path, options["model_path"],
+                                         workers=options["asr_workers"], use_server=False)
+    return {}
+
+def stage_clips(project, options, backend):
+    temp_dir = os.path.join(project["folder"], f"clips_{backend}")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    clips = make_video.generate_clip_commands(project["images"], project["per_image_duration"], temp_dir,
+                                              jobs=options["jobs"], backend=backend, profile=options["profile"])
+    return {"clips": len(clips)}
+
+def stage_filter_graph(project, options):
+    iterations = 1000
+    for _ in range(iterations):
+        make_video.build_filter_chain(project["images"], project["per_image_duration"])
+        make_video.build_filter_chain(project["images"], project["per_image_duration"], ken_burns=True)
+    return {"iterations": iterations}
+
+def stage_final_encode(project, options):
+    temp_dir = os.path.join(project["folder"], f"clips_{options['backends'][0]}")
+    clips = [os.path.join(temp_dir, f"clip_{i}.mp4") for i in range(len(project["images"]))]
+    make_video.encode_video(project["images"], clips, project["per_image_duration"], project["audio"],
+                            os.path.join(project["folder"], "subtitles.ass"),
+                            os.path.join(project["folder"], "final_encode.mp4"), profile=options["profile"])
+    return {}
+
+def stage_single_pass_encode(project, options):
+    make_video.encode_video(project["images"], None, project["per_image_duration"], project["audio"],
+                            os.path.join(project["folder"], "subtitles.ass"),
+                            os.path.join(project["folder"], "single_pass.mp4"), profile=options["profile"])
+    return {}
+
+def stage_preview(project, options):
+    # Same encode as make_video.create_preview; mixed photo sizes must come out with square pixels
+    output_path = os.path.join(project["folder"], "preview.mp4")
+    preview = preview_profile(get_profile(options["profile"]))
+    make_video.encode_timeline(project["images"], project["per_image_duration"], project["audio"],
+                               os.path.join(project["folder"], "subtitles.ass"), output_path, preview,
+                               ken_burns=True, simple_motion=True)
+    # Timelines assembled in chunks go through rawvideo and carry no SAR at all, which also means square
+    info = subprocess.run([make_video.FFMPEG, "-i", output_path], stderr=subprocess.PIPE, text=True).stderr
+    sar = info.split("[SAR ", 1)[1].split()[0] if "[SAR " in info else "1:1"
+    if sar != "1:1":
+        raise RuntimeError(f"Preview has non-square pixels (SAR {sar}): {output_path}")
+    frames = count_frames(output_path)
+    expected = round(make_video.get_audio_duration(project["audio"]) * preview.fps)
+    if frames != expected:
+        raise RuntimeError(f"Preview has {frames} frames, expected {expected}")
+    return {"frames": frames}
+
+# The NumPy backend is checked against the zoompan graph, which follows
+# the same ken_burns.py motion; photo-like images measure 35-43 dB
+NUMPY_PARITY_MIN_PSNR = 30.0
+
+def stage_numpy_parity(project, options):
+    work_dir = os.path.join(project["folder"], "numpy_parity")
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    # One image of each size in MIXED_SIZES
+    for image in project["images"][:len(MIXED_SIZES)]:
+        results.append(compare_with_zoompan(image, project["per_image_duration"], work_dir, options["profile"]))
+    psnr = min(r["psnr"] for r in results)
+    if psnr < NUMPY_PARITY_MIN_PSNR:
+        raise RuntimeError(f"NumPy clips differ from zoompan: {psnr:.2f} dB < {NUMPY_PARITY_MIN_PSNR} dB")
+    return {
+        "min_psnr_vs_zoompan": round(psnr, 2),
+        "numpy_seconds": round(sum(r["numpy_seconds"] for r in results), 3),
+        "zoompan_seconds": round(sum(r["zoompan_seconds"] for r in results), 3),
+    }
+
+# Renditions published next to the main video. "separate" is the old way:
+# the final encode, then a downscale encode of it per rendition. "shared"
+# makes all of them from the final encode's filter graph.
+BENCH_RENDITIONS = ["720p", "small"]
+
+def count_frames(path):
+    """Number of video frames in path, by decoding it with ffmpeg"""
+    result = subprocess.run([make_video.FFMPEG, "-i", path, "-map", "0:v", "-f", "null", "-"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    for line in reversed(result.stderr.splitlines()):
+        if line.startswith("frame="):
+            return int(line.split("=", 1)[1].split()[0])
+    raise RuntimeError(f"Could not count frames in {path}")
+
+def stage_renditions(project, options, mode):
+    temp_dir = os.path.join(project["folder"], f"clips_{options['backends'][0]}")
+    clips = [os.path.join(temp_dir, f"clip_{i}.mp4") for i in range(len(project["images"]))]
+    output_path = os.path.join(project["folder"], f"renditions_{mode}.mp4")
+    profile = get_profile(options["profile"])
+    renditions = [(make_video.get_rendition_path(output_path, name), rendition_profile(profile, name))
+                  for name in BENCH_RENDITIONS]
+    if mode == "shared":
+        make_video.encode_video(project["images"], clips, project["per_image_duration"], project["audio"],
+                                os.path.join(project["folder"], "subtitles.ass"), output_path, profile=profile,
+                                renditions=renditions)
+    else:
+        make_video.encode_video(project["images"], clips, project["per_image_duration"], project["audio"],
+                                os.path.join(project["folder"], "subtitles.ass"), output_path, profile=profile)
+        for rendition_path, rendition in renditions:
+            subprocess.run([
+                make_video.FFMPEG, "-y", "-loglevel", "error", "-i", output_path,
+                "-vf", f"scale={rendition.width}:{rendition.height}:flags=lanczos",
+            ] + encoder_args(rendition) + ["-c:a", "copy", rendition_path], check=True)
+    frames = {path: count_frames(path) for path in [output_path] + [path for path, _ in renditions]}
+    if len(set(frames.values())) != 1:
+        raise RuntimeError(f"Renditions have different frame counts: {frames}")
+    return {"renditions": len(renditions) + 1, "frames": frames[output_path]}
+
+# Intermediate clip transports, rendered with the NumPy backend. "tmpfs" is
+# the h264 path with temp clips in RAM. Each output's PSNR is measured
+# against the pipe render, which goes through only one lossy encode.
+TRANSPORTS = {
+    "pipe": ("pipe", None),
+    "h264": ("h264", None),
+    "lossless": ("lossless", None),
+    "tmpfs": ("h264", "/dev/shm"),
+}
+
+def stage_transport(project, options, transport):
+    intermediate, temp_root = TRANSPORTS[transport]
+    temp_dir = make_video.get_temp_dir(os.path.join(project["folder"], f"transport_{transport}"), temp_root)
+    output_path = os.path.join(project["folder"], f"transport_{transport}.mp4")
+    os.makedirs(temp_dir, exist_ok=True)
+    try:
+        render_options = make_video.RenderOptions(jobs=options["jobs"], backend="numpy", profile=options["profile"],
+                                                  prep_images=False, intermediate=intermediate)
+        make_video.render_video(project["images"], project["per_image_duration"], project["audio"],
+                                os.path.join(project["folder"], "subtitles.ass"), output_path, temp_dir,
+                                options=render_options)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    reference = os.path.join(project["folder"], "transport_pipe.mp4")
+    if transport != "pipe" and os.path.exists(reference):
+        return {"psnr_vs_pipe": round(measure_psnr(reference, output_path), 2)}
+    return {}
+
+def stage_full_pipeline(project, options):
+    render_options = make_video.RenderOptions(jobs=options["jobs"], backend=options["backends"][0],
+                                              profile=options["profile"], force=True)
+    make_video.main(project["folder"], "full", render_options, asr_workers=options["asr_workers"])
+    return {}
+
+STAGES = {
+    "audio_decode": stage_audio_decode,
+    "transcription": stage_transcription,
+    "filter_graph": stage_filter_graph,
+    "final_encode": stage_final_encode,
+    "single_pass_encode": stage_single_pass_encode,
+    "preview": stage_preview,
+    "numpy_parity": stage_numpy_parity,
+    "full_pipeline": stage_full_pipeline,
+}
+
+def _run_stage_in_child(name, project, options):
+    """Runs inside a fresh worker process so RSS peaks are per stage"""
+    if options["stub_asr"]:
+        use_stub_recognizer()
+    start = time.perf_counter()
+    if name.startswith("clips_"):
+        details = stage_clips(project, options, name[len("clips_"):])
+    elif name.startswith("transport_"):
+        details = stage_transport(project, options, name[len("transport_"):])
+    elif name.startswith("renditions_"):
+        details = stage_renditions(project, options, name[len("renditions_"):])
+    else:
+        details = STAGES[name](project, options)
+    wall = time.perf_counter() - start
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "wall_seconds": round(wall, 3),
+        "realtime_factor": round(project["duration"] / wall, 2) if wall > 0 else None,
+        "peak_rss_mb": round(max_rss_mb(resource.getrusage(resource.RUSAGE_SELF)), 1),
+        "peak_child_rss_mb": round(max_rss_mb(children), 1),
+        "child_cpu_seconds": round(children.ru_utime + children.ru_stime, 2),
+        **details,
+    }
+
+def run_stage(name, project, options):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_run_stage_in_child, name, project, options).result()
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def compare(results, baseline, tolerance):
+    """Print wall-time changes against a baseline; return names of regressed stages"""
+    regressions = []
+    print(f"\n{'stage':<28}{'baseline':>10}{'now':>10}{'change':>10}")
+    for name, result in results["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or "wall_seconds" not in before or "wall_seconds" not in result:
+            print(f"{name:<28}{'-':>10}{result.get('wall_seconds', '-'):>10}{'new':>10}")
+            continue
+        change = (result["wall_seconds"] - before["wall_seconds"]) / before["wall_seconds"]
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  ⚠️"
+        print(f"{name:<28}{before['wall_seconds']:>10.2f}{result['wall_seconds']:>10.2f}{change:>+10.1%}{flag}")
+    return regressions
+
+def run_benchmark(options):
+    work_dir = options["work_dir"] or tempfile.mkdtemp(prefix="video-joiner-bench-")
+    folder = os.path.join(work_dir, "project")
+    print(f"Creating synthetic project in {folder}...")
+    make_project(folder, options["images"], options["width"], options["height"], options["seconds"],
+                 options["audio"], options["mixed_sizes"])
+
+    images = make_video.find_images(folder)
+    audio = os.path.join(folder, "audio.mp3")
+    duration = make_video.get_audio_duration(audio)
+    project = {
+        "folder": folder,
+        "images": images,
+        "audio": audio,
+        "duration": duration,
+        "per_image_duration": duration / len(images),
+    }
+
+    stage_names = options["stages"] or (
+        ["audio_decode", "transcription"]
+        + [f"clips_{backend}" for backend in options["backends"]]
+        + ["filter_graph", "final_encode", "single_pass_encode", "preview", "numpy_parity"]
+        + ["renditions_separate", "renditions_shared"]
+        + [f"transport_{transport}" for transport in TRANSPORTS]
+        + ["full_pipeline"]
+    )
+
+    results = {
+        "config": {key: options[key] for key in
+                   ("images", "width", "height", "mixed_sizes", "seconds", "audio", "backends", "jobs", "asr_workers",
+                    "profile")},
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count(), "python": platform.python_version()},
+        "stub_asr": options["stub_asr"],
+        "stages": {},
+    }
+    for name in stage_names:
+        print(f"▶️  {name}")
+        try:
+            results["stages"][name] = run_stage(name, project, options)
+            r = results["stages"][name]
+            print(f"   {r['wall_seconds']:.2f}s, {r['realtime_factor']}x realtime, "
+                  f"peak RSS {r['peak_rss_mb']:.0f} MB (children {r['peak_child_rss_mb']:.0f} MB)")
+        except Exception as e:
+            results["stages"][name] = {"error": str(e)}
+            print(f"   ❌ {e}")
+
+    if not options["keep"] and not options["work_dir"]:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on a synthetic project")
+    parser.add_argument("--images", type=int, default=10, help="Number of images")
+    parser.add_argument("--width", type=int, default=3000, help="Source image width")
+    parser.add_argument("--height", type=int, default=4000, help="Source image height")
+    parser.add_argument("--uniform-sizes", action="store_true",
+                        help="Make every image exactly --width x --height instead of mixing shapes")
+    parser.add_argument("--seconds", type=float, default=60, help="Audio length in seconds")
+    parser.add_argument("--audio", choices=["speech", "tone"], default="speech", help="Kind of synthetic audio")
+    parser.add_argument("--backends", default="numpy", help="Comma-separated clip backends to benchmark")
+    parser.add_argument("--stages", help="Comma-separated subset of stages to run (default: all)")
+    parser.add_argument("--jobs", type=int, default=None, help="Parallel clip renders")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE, help="Render profile")
+    parser.add_argument("--asr-workers", type=int, default=1, help="Speech recognition processes")
+    parser.add_argument("--model-path", default=generate_subs.DEFAULT_MODEL_PATH,
+                        help="Vosk model; a stub recognizer is used when it does not exist")
+    parser.add_argument("--work-dir", help="Where to create the project (kept afterwards)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary project folder")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--save-baseline", help="Write the results as a baseline JSON file")
+    parser.add_argument("--baseline", help="Compare against a saved baseline JSON file")
+    parser.add_argument("--start-method", choices=["fork", "spawn", "forkserver"],
+                        help="multiprocessing start method (spawn is the default on macOS)")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed slowdown vs the baseline before a stage counts as a regression")
+
+    args = parser.parse_args()
+    if args.start_method:
+        multiprocessing.set_start_method(args.start_method)
+    stub_asr = not os.path.isdir(args.model_path)
+    if stub_asr:
+        print(f"⚠️  Vosk model not found at {args.model_path}, using the stub recognizer")
+
+    options = {
+        "images": args.images,
+        "width": args.width,
+        "height": args.height,
+        "mixed_sizes": not args.uniform_sizes,
+        "seconds": args.seconds,
+        "audio": args.audio,
+        "backends": args.backends.split(","),
+        "stages": args.stages.split(",") if args.stages else None,
+        "jobs": args.jobs,
+        "profile": args.profile,
+        "asr_workers": args.asr_workers,
+        "model_path": args.model_path,
+        "stub_asr": stub_asr,
+        "work_dir": args.work_dir,
+        "keep": args.keep,
+    }
+    results = run_benchmark(options)
+
+    print(json.dumps(results, indent=2))
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n⚠️  Slower than baseline: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+
+from clip_cache import hash_file
+
+# Bump when what goes into a step's fingerprint changes
+BUILD_VERSION = 1
+MANIFEST_NAME = ".video-joiner-build.json"
+
+class BuildGraph:
+    """make-style incremental builds for one project folder.
+
+    Each step has a fingerprint built from its input files' contents and its
+    parameters. The manifest (<folder>/.video-joiner-build.json) records the
+    fingerprint each step was last built with; a step reruns only when its
+    fingerprint changed or one of its outputs is missing. Steps that consume
+    another step's output list that output file as an input, so an upstream
+    rebuild (or a manual edit, such as regenerate-subs) propagates downstream.
+    File hashes are remembered by (size, mtime) so unchanged files are not
+    re-read on every run. Output mtimes are recorded with each build, so files
+    edited by hand since then can be told apart from stale ones.
+    """
+
+    def __init__(self, folder_path, force=False):
+        self.manifest_path = os.path.join(folder_path, MANIFEST_NAME)
+        self.force = force
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+        if self.manifest.get("version") != BUILD_VERSION:
+            self.manifest = {"version": BUILD_VERSION, "steps": {}, "files": {}}
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        known = self.manifest["files"].get(key)
+        if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime:
+            return known["sha256"]
+        digest = hash_file(path)
+        self.manifest["files"][key] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest}
+        return digest
+
+    def fingerprint(self, files=(), **params):
+        payload = json.dumps({
+            "files": [self.file_hash(path) for path in files],
+            "params": params,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def is_current(self, name, fingerprint, outputs):
+        return (not self.force
+                and self.manifest["steps"].get(name) == fingerprint
+                and all(os.path.exists(path) for path in outputs))
+
+    def step(self, name, fingerprint, outputs, func, *args):
+        """Run func(*args) unless the step is up to date. Returns True if it ran."""
+        if self.is_current(name, fingerprint, outputs):
+            print(f"⏭️  {name}: up to date")
+            return False
+        print(f"🔨 {name}: building")
+        func(*args)
+        self.record(name, fingerprint, outputs)
+        return True
+
+    def record(self, name, fingerprint, outputs=()):
+        """Mark a step as built with this fingerprint (for steps run outside step())"""
+        self.manifest["steps"][name] = fingerprint
+        self.manifest.setdefault("outputs", {})[name] = {
+            os.path.abspath(path): os.stat(path).st_mtime for path in outputs if os.path.exists(path)
+        }
+        self.save()
+
+    def edited_outputs(self, name, outputs):
+        """Outputs modified after the step last built them (or with no recorded build time)"""
+        built = self.manifest.get("outputs", {}).get(name, {})
+        return [path for path in outputs
+                if os.path.exists(path) and os.stat(path).st_mtime > built.get(os.path.abspath(path), float("-inf"))]
+
+    def save(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+# Bump when the layout or key recipe changes so stale entries are never reused
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "VIDEO_JOINER_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "video-joiner", "clips"),
+)
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3  # 20 GB
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ClipCache:
+    """Content-addressed store of rendered clips shared across project folders.
+
+    Entries are keyed by the source image's content hash plus every render
+    parameter, so the same image in two folders renders once. Hits refresh the
+    entry's mtime, and eviction removes the least recently used entries once
+    the total size exceeds max_bytes. `suffix` is the extension of the stored
+    files, so other derived files (e.g. prepared images) can use the same store.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, suffix=".mp4"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, image_path, **params):
+        """Build the cache key for an image and its render parameters"""
+        payload = json.dumps(
+            {"version": CACHE_VERSION, "image": hash_file(image_path), **params},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}{self.suffix}")
+
+    def fetch(self, key, dest):
+        """Copy a cached clip to dest. Returns False on a cache miss."""
+        cached = self.path_for(key)
+        try:
+            # Refresh the LRU timestamp before copying so a concurrent
+            # eviction is less likely to pick this entry
+            os.utime(cached)
+            shutil.copyfile(cached, dest)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, key, src):
+        """Add a rendered clip to the cache and evict old entries if needed"""
+        # Write to a temp file first so readers never see a partial clip
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, self.path_for(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used clips until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # Another process sharing the cache already evicted it
+                    pass
+                total -= size
@@ -0,0 +1,310 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+
+# A leased job whose file hasn't been touched for this long is handed to another worker
+LEASE_SECONDS = 30
+# Workers refresh their leases this many times per lease period while rendering
+HEARTBEATS_PER_LEASE = 4
+# Jobs are given up after this many lost leases
+MAX_ATTEMPTS = 3
+POLL_SECONDS = 0.5
+
+class ClipQueue:
+    """Directory-backed queue of clip render jobs, shared by hosts over a network mount.
+
+    A job moves between subdirectories of queue_dir by atomic renames:
+    pending/<id>.json -> leased/<id>@<worker>.json -> done/<id>.json. Only
+    one worker can win the rename out of pending/ (into a private name in
+    tmp/, where its lease is started), so a job is claimed exactly once. Workers touch their lease file while rendering; a lease
+    older than lease_seconds belongs to a lost worker and is moved back to
+    pending/ (up to max_attempts times). Images are staged into images/ and
+    rendered clips are written to clips/, so queue_dir is the only storage
+    that has to be shared. `local_workers` worker processes are started on
+    this machine for every batch of jobs, standing in for render nodes.
+    """
+
+    def __init__(self, queue_dir, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS, local_workers=0):
+        self.queue_dir = queue_dir
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.local_workers = local_workers
+        for name in ("pending", "leased", "done", "images", "clips", "tmp"):
+            os.makedirs(os.path.join(queue_dir, name), exist_ok=True)
+
+    def path(self, *parts):
+        return os.path.join(self.queue_dir, *parts)
+
+    def _write_json(self, path, data):
+        # Write next to the queue and rename so nobody sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.path("tmp"), suffix=".json")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def submit(self, run_id, index, image_path, per_image_duration, backend, template_content, profile):
+        """Stage the image and queue one clip job; returns the job"""
+        job_id = f"{run_id}_{index:06d}"
+        staged_image = self.path("images", job_id + os.path.splitext(image_path)[1])
+        shutil.copyfile(image_path, staged_image)
+        job = {
+            "id": job_id,
+            "index": index,
+            "image": os.path.relpath(staged_image, self.queue_dir),
+            "source": image_path,
+            "duration": per_image_duration,
+            "backend": backend,
+            "template": template_content,
+            "profile": profile._asdict(),
+            "attempts": 0,
+        }
+        self._write_json(self.path("pending", f"{job_id}.json"), job)
+        return job
+
+    def claim(self, worker_id):
+        """Lease the oldest pending job; returns (job, lease path) or None when there is none"""
+        for name in sorted(os.listdir(self.path("pending"))):
+            if not name.endswith(".json"):
+                continue
+            lease_path = self.path("leased", f"{name[:-5]}@{worker_id}.json")
+            claim_path = self.path("tmp", f"{name[:-5]}@{worker_id}.{uuid.uuid4().hex}.json")
+            try:
+                os.rename(self.path("pending", name), claim_path)
+            except FileNotFoundError:
+                # Another worker got there first
+                continue
+            # The rename keeps the old mtime, so start the lease before
+            # requeue_expired can see it in leased/
+            os.utime(claim_path)
+            os.rename(claim_path, lease_path)
+            with open(lease_path, 'r', encoding='utf-8') as f:
+                return json.load(f), lease_path
+        return None
+
+    def complete(self, job, lease_path, clip_path=None, error=None, **fields):
+        """Publish a job's clip (or error) and release its lease.
+
+        Nothing is published once the lease is gone: the job was requeued or
+        discarded, and the coordinator may already have collected another
+        worker's result.
+        """
+        if not os.path.exists(lease_path):
+            print(f"🗑️  Lease on {job['id']} was taken back; dropping this result")
+            return
+        result = {"id": job["id"], "index": job["index"], "error": error, **fields}
+        if clip_path is not None:
+            result["clip"] = os.path.join("clips", f"{job['id']}.mp4")
+            fd, tmp_path = tempfile.mkstemp(dir=self.path("tmp"), suffix=".mp4")
+            os.close(fd)
+            shutil.copyfile(clip_path, tmp_path)
+            os.replace(tmp_path, self.path(result["clip"]))
+        self._write_json(self.path("done", f"{job['id']}.json"), result)
+        try:
+            os.remove(lease_path)
+        except FileNotFoundError:
+            # Expired while the clip was being copied; done/ has one result either way
+            pass
+
+    def requeue_expired(self):
+        """Move jobs whose workers stopped heartbeating back to pending/. Returns how many moved."""
+        requeued = 0
+        now = time.time()
+        for name in os.listdir(self.path("leased")):
+            lease_path = self.path("leased", name)
+            try:
+                if now - os.stat(lease_path).st_mtime < self.lease_seconds:
+                    continue
+                # Whoever wins this rename handles the expired lease
+                tmp_path = self.path("tmp", f"{name}.{uuid.uuid4().hex}")
+                os.rename(lease_path, tmp_path)
+            except FileNotFoundError:
+                continue
+            with open(tmp_path, 'r', encoding='utf-8') as f:
+                job = json.load(f)
+            job["attempts"] += 1
+            worker_id = name[:-5].partition("@")[2]
+            if job["attempts"] >= self.max_attempts:
+                self._write_json(self.path("done", f"{job['id']}.json"), {
+                    "id": job["id"], "index": job["index"],
+                    "error": f"lost {job['attempts']} workers while rendering (last: {worker_id})",
+                })
+            else:
+                print(f"♻️  Lease on {job['id']} expired (worker {worker_id}), requeueing")
+                self._write_json(self.path("pending", f"{job['id']}.json"), job)
+                requeued += 1
+            os.remove(tmp_path)
+        return requeued
+
+    def collect(self, job_id):
+        """Read a finished job's result, or None if it isn't done yet"""
+        try:
+            with open(self.path("done", f"{job_id}.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def discard(self, job):
+        """Remove the files a job left in the queue, withdrawing it if it is still pending or leased"""
+        # Without its lease, a worker still rendering the job drops its result
+        leases = [self.path("leased", name) for name in os.listdir(self.path("leased"))
+                  if name.startswith(f"{job['id']}@")]
+        for path in [self.path("pending", f"{job['id']}.json"), self.path("done", f"{job['id']}.json"),
+                     self.path("clips", f"{job['id']}.mp4"), self.path(job["image"])] + leases:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def render_queued(queue, indices, images, per_image_duration, temp_dir, backend, template_content, profile,
+                  poll=POLL_SECONDS):
+    """Queue clips for the workers and yield (index, clip path or exception) as they finish.
+
+    Finished clips are moved to temp_dir/clip_<index>.mp4, like local renders.
+    Expired leases are requeued while waiting, so a lost worker's clips go to
+    the remaining workers.
+    """
+    run_id = uuid.uuid4().hex[:12]
+    jobs = {}
+    workers = []
+    try:
+        for i in indices:
+            job = queue.submit(run_id, i, images[i], per_image_duration, backend, template_content, profile)
+            jobs[job["id"]] = job
+        print(f"📬 Queued {len(jobs)} clips in {queue.queue_dir}")
+        if queue.local_workers:
+            workers = start_local_workers(queue.queue_dir, queue.local_workers, queue.lease_seconds)
+        else:
+            print(f"   Start workers with: python clip_queue.py worker {queue.queue_dir}")
+        waiting = set(jobs)
+        while waiting:
+            queue.requeue_expired()
+            for job_id in sorted(waiting):
+                result = queue.collect(job_id)
+                if result is None:
+                    continue
+                waiting.discard(job_id)
+                i = jobs[job_id]["index"]
+                if result.get("error"):
+                    yield i, RuntimeError(f"{result['error']} (worker {result.get('worker', 'unknown')})")
+                else:
+                    out = os.path.join(temp_dir, f"clip_{i}.mp4")
+                    shutil.move(queue.path(result["clip"]), out)
+                    yield i, out
+                queue.discard(jobs[job_id])
+            if waiting:
+                time.sleep(poll)
+    finally:
+        # Withdraws jobs nobody has finished when the run fails or is interrupted
+        for job in jobs.values():
+            queue.discard(job)
+        for worker in workers:
+            # Idle local workers have exited already; this stops any still rendering
+            worker.terminate()
+            worker.wait()
+
+def _heartbeat(lease_path, stop, interval):
+    while not stop.wait(interval):
+        try:
+            os.utime(lease_path)
+        except FileNotFoundError:
+            # Lease expired and was taken back; finish anyway, the first result wins
+            return
+
+def render_job(queue, job, work_dir):
+    """Render one claimed job with this host's copy of the clip backend"""
+    # Imported here: make_video imports this module for the coordinator side
+    import make_video
+    from render_profiles import RenderProfile
+
+    render, _ = make_video.CLIP_BACKENDS[job["backend"]]
+    profile = RenderProfile(**job["profile"])
+    return render(job["index"], queue.path(job["image"]), job["duration"], work_dir, job["template"], profile)
+
+def run_worker(queue, worker_id=None, poll=POLL_SECONDS, exit_when_idle=False):
+    """Claim and render jobs until stopped (or, with exit_when_idle, until the queue is empty)"""
+    if worker_id is None:
+        worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"👷 Worker {worker_id} watching {queue.queue_dir}")
+    rendered = 0
+    while True:
+        claimed = queue.claim(worker_id)
+        if claimed is None:
+            # Idle workers also rescue jobs from workers that died
+            if queue.requeue_expired() == 0 and exit_when_idle and not os.listdir(queue.path("leased")):
+                break
+            time.sleep(poll)
+            continue
+        job, lease_path = claimed
+        stop = threading.Event()
+        interval = queue.lease_seconds / HEARTBEATS_PER_LEASE
+        heartbeat = threading.Thread(target=_heartbeat, args=(lease_path, stop, interval), daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        try:
+            with tempfile.TemporaryDirectory(prefix="clip_worker_") as work_dir:
+                try:
+                    clip = render_job(queue, job, work_dir)
+                except Exception as e:
+                    traceback.print_exc()
+                    queue.complete(job, lease_path, error=str(e), worker=worker_id)
+                    print(f"❌ {job['id']} ({job['source']}) failed")
+                else:
+                    seconds = round(time.perf_counter() - start, 3)
+                    queue.complete(job, lease_path, clip, worker=worker_id, seconds=seconds)
+                    rendered += 1
+                    print(f"✅ {job['id']} ({job['source']}) in {seconds:.1f}s")
+        finally:
+            stop.set()
+            heartbeat.join()
+    print(f"👋 Worker {worker_id} rendered {rendered} clips")
+    return rendered
+
+def start_local_workers(queue_dir, count, lease_seconds=LEASE_SECONDS):
+    """Start worker processes on this machine that exit once the queue is empty"""
+    script = os.path.abspath(__file__)
+    cmd = [sys.executable, script, "worker", queue_dir, "--lease", str(lease_seconds), "--exit-when-idle"]
+    return [subprocess.Popen(cmd + ["--worker-id", f"{socket.gethostname()}-local{n}"]) for n in range(count)]
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render clips queued by make_video.py --queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    worker_parser = subparsers.add_parser("worker", help="Claim and render queued clips")
+    worker_parser.add_argument("queue_dir", help="Queue directory on storage shared with the coordinator")
+    worker_parser.add_argument("--jobs", "-j", type=int, default=1,
+                               help="Clips to render at once, each with its own lease")
+    worker_parser.add_argument("--worker-id", help="Name shown in results and lease files (default: host-pid)")
+    worker_parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                               help="Seconds without a heartbeat before a lease is given to another worker")
+    worker_parser.add_argument("--exit-when-idle", action="store_true",
+                               help="Stop once no jobs are pending or leased instead of waiting for more")
+    status_parser = subparsers.add_parser("status", help="Count jobs in each state")
+    status_parser.add_argument("queue_dir")
+
+    args = parser.parse_args()
+    if args.command == "status":
+        queue = ClipQueue(args.queue_dir)
+        for state in ("pending", "leased", "done"):
+            print(f"{state}: {len(os.listdir(queue.path(state)))}")
+    else:
+        queue = ClipQueue(args.queue_dir, args.lease)
+        worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        if args.jobs <= 1:
+            run_worker(queue, worker_id, exit_when_idle=args.exit_when_idle)
+        else:
+            threads = [threading.Thread(target=run_worker, args=(queue, f"{worker_id}-{n}"),
+                                        kwargs={"exit_when_idle": args.exit_when_idle})
+                       for n in range(args.jobs)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
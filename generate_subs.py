@@ -1,291 +1,537 @@
 from vosk import Model, KaldiRecognizer
-import wave
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import itertools
+import socket
+import subprocess
+import tempfile
 import json
 import os
 import re
 import pathlib
-
-def format_time_ass(seconds):
-    h = int(seconds // 3600)
-    m = int((seconds % 3600) // 60)
-    s = int(seconds % 60)
-    cs = int((seconds - int(seconds)) * 100)  # centiseconds for ASS
-    return f"{h}:{m:02}:{s:02}.{cs:02}"
-
-def format_time_readable(seconds):
-    m = int(seconds // 60)
-    s = int(seconds % 60)
-    return f"{m:02}:{s:02}"
+from clip_cache import hash_file
+from subtitle_engine import (PAUSE_SECONDS, Word, create_phrase_chunks, format_time_ass, format_time_readable,
+                             is_sentence_end, iter_phrase_chunks, peek, write_chunks, write_subtitles)
+
+FFMPEG = "/opt/homebrew/bin/ffmpeg"
+
+DEFAULT_MODEL_PATH = str(pathlib.Path(__file__).parent / "vosk-model-hi-0.22")
+# Where transcribe_server.py listens; used automatically when it is running
+DEFAULT_SOCKET_PATH = os.environ.get(
+    "VIDEO_JOINER_ASR_SOCKET",
+    os.path.join(tempfile.gettempdir(), "video-joiner-vosk.sock"),
+)
+
+# Vosk models are trained on 16 kHz mono audio
+SAMPLE_RATE = 16000
+# Feed the recognizer two seconds of 16-bit PCM per call
+PCM_CHUNK_BYTES = SAMPLE_RATE * 2 * 2
+# Parallel recognition aims for segments about this long, cut at silences
+TARGET_SEGMENT_SECONDS = 60
+# Silences at least this long are not sent to the recognizer...
+SKIP_SILENCE_SECONDS = 1.0
+# ...apart from this much on each side, so word onsets and tails are kept
+SPEECH_PADDING_SECONDS = 0.25
+
+# Bump when the word timings sidecar layout changes
+WORDS_VERSION = 1
+
+def stream_pcm(audio_path, chunk_bytes=PCM_CHUNK_BYTES):
+    """Decode any audio file to 16 kHz mono s16le PCM through an ffmpeg pipe.
+
+    Yields raw PCM chunks as they are decoded, so nothing is written to disk.
+    """
+    cmd = [
+        FFMPEG, "-nostdin", "-loglevel", "error",
+        "-i", audio_path,
+        "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "s16le", "-"
+    ]
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+        try:
+            while True:
+                data = proc.stdout.read(chunk_bytes)
+                if not data:
+                    break
+                yield data
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"Failed to decode audio {audio_path}: {stderr}")
 
 def parse_time_readable(time_str):
-    """Parse MM:SS format back to seconds"""
+    """Parse MM:SS.mmm (or the older MM:SS) format back to seconds"""
     parts = time_str.split(':')
     if len(parts) == 2:
-        return int(parts[0]) * 60 + int(parts[1])
+        return int(parts[0]) * 60 + float(parts[1])
     return 0
 
-def is_sentence_end(word):
-    # Check if word ends a sentence (has punctuation)
-    return word['word'].strip().endswith(('.', '।', '!', '?', ':'))
-
-def create_phrase_chunks(all_words, max_words_per_chunk=4):
-    # Group words into phrases/chunks with natural breaks
-    chunks = []
-    current_chunk = []
-
-    for word in all_words:
-        current_chunk.append(word)
-
-        # Break chunk if:
-        # 1. We've reached max words
-        # 2. Word ends a sentence
-        # 3. There's a significant pause (gap > 0.5s)
-        should_break = False
-
-        if len(current_chunk) >= max_words_per_chunk:
-            should_break = True
-        elif is_sentence_end(word):
-            should_break = True
-        elif len(current_chunk) > 1:
-            # Check for pause (gap > 0.5s between words)
-            prev_word = current_chunk[-2]
-            gap = word['start'] - prev_word['end']
-            if gap > 0.5:
-                should_break = True
-
-        if should_break:
-            chunks.append(current_chunk)
-            current_chunk = []
-    if current_chunk:
-        chunks.append(current_chunk)
-
-    return chunks
+def iter_edited_chunks(txt_path):
+    """Parse an edited text file back into chunks for ASS generation, one phrase at a time"""
+    with open(txt_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+
+            # Look for phrase header: "Phrase X: [MM:SS.mmm - MM:SS.mmm]"
+            if not (line.startswith("Phrase ") and ":" in line and "[" in line and "]" in line):
+                continue
+            # Extract timing
+            timing_match = re.search(r'\[(\d{2}:\d{2}(?:\.\d+)?) - (\d{2}:\d{2}(?:\.\d+)?)\]', line)
+            if not timing_match:
+                continue
+            phrase_start = parse_time_readable(timing_match.group(1))
+            phrase_end = parse_time_readable(timing_match.group(2))
+
+            # Find the text line (next line should be "Text: ...")
+            text_line = next(f, "").strip()
+            if not text_line.startswith("Text:"):
+                continue
+            text = text_line.replace("Text:", "").strip()
+
+            # The "Word N: [start-end]" lines that follow, up to the blank line
+            word_times = []
+            for word_line in f:
+                word_line = word_line.strip()
+                if not word_line:
+                    break
+                word_match = re.match(r'Word \d+: \[(\d{2}:\d{2}(?:\.\d+)?)-(\d{2}:\d{2}(?:\.\d+)?)\]', word_line)
+                if word_match:
+                    word_times.append((parse_time_readable(word_match.group(1)),
+                                       parse_time_readable(word_match.group(2))))
+
+            words = text.split()
+            if len(word_times) == len(words):
+                # Same word count: keep the recognized timing, so unedited phrases come back unchanged
+                yield [Word(word, start, end) for word, (start, end) in zip(words, word_times)]
+                continue
+            # Otherwise spread the words evenly over the phrase
+            word_duration = (phrase_end - phrase_start) / len(words)
+            yield [
+                Word(word, phrase_start + (j * word_duration), phrase_start + ((j + 1) * word_duration))
+                for j, word in enumerate(words)
+            ]
 
 def parse_edited_subtitles(txt_path):
     """Parse an edited text file back into chunks for ASS generation"""
-    chunks = []
-    current_chunk = []
-    
-    with open(txt_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        # Look for phrase header: "Phrase X: [MM:SS - MM:SS]"
-        if line.startswith("Phrase ") and ":" in line and "[" in line and "]" in line:
-            # Extract timing
-            timing_match = re.search(r'\[(\d{2}:\d{2}) - (\d{2}:\d{2})\]', line)
-            if timing_match:
-                phrase_start = parse_time_readable(timing_match.group(1))
-                phrase_end = parse_time_readable(timing_match.group(2))
-                
-                # Find the text line (next line should be "Text: ...")
-                i += 1
-                if i < len(lines) and lines[i].strip().startswith("Text:"):
-                    text_line = lines[i].strip()
-                    text = text_line.replace("Text:", "").strip()
-                    
-                    # Split text into words and create word objects
-                    words = text.split()
-                    word_duration = (phrase_end - phrase_start) / len(words)
-                    
-                    word_objects = []
-                    for j, word in enumerate(words):
-                        word_start = phrase_start + (j * word_duration)
-                        word_end = phrase_start + ((j + 1) * word_duration)
-                        word_objects.append({
-                            'word': word,
-                            'start': word_start,
-                            'end': word_end
-                        })
-                    
-                    chunks.append(word_objects)
-        
-        i += 1
-    
-    return chunks
+    return list(iter_edited_chunks(txt_path))
 
-def regenerate_ass_from_edited_txt(txt_path, ass_path):
+def regenerate_ass_from_edited_txt(txt_path, ass_path, extra_formats=()):
     """Regenerate ASS file from edited text file"""
     print(f"📝 Parsing edited subtitles from: {txt_path}")
-    chunks = parse_edited_subtitles(txt_path)
-    
-    if not chunks:
-        raise ValueError("No valid subtitle data found in text file. Please check the format.")
-    
-    ass_header = '''[Script Info]
-Title: Word Highlight Subtitles
-ScriptType: v4.00+
-WrapStyle: 1
-ScaledBorderAndShadow: yes
-YCbCr Matrix: TV.601
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,Lava Devanagari,35,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,1,0,0,0,100,100,0,0,1,2,1,2,50,50,40,1
-
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-'''
-
-    events = []
-
-    for chunk_idx, chunk in enumerate(chunks):
-        phrase_words = [w['word'] for w in chunk]
-        for i, word in enumerate(chunk):
-            # Build the phrase, highlighting only the current word
-            text_parts = []
-            for j, w in enumerate(chunk):
-                if i == j:
-                    # Highlight current word
-                    text_parts.append(r'{\b1\c&H00FFFF&\3c&H000000&}' + w['word'] + r'{\r}')
-                else:
-                    text_parts.append(w['word'])
-            text = ' '.join(text_parts)
-
-            # Start time: current word start
-            start_time = format_time_ass(word['start'])
+    first, chunks = peek(iter_edited_chunks(txt_path))
 
-            # End time: next word start (or next phrase start if last word)
-            if i < len(chunk) - 1:
-                # Not the last word - end when next word starts
-                end_time = format_time_ass(chunk[i + 1]['start'])
-            else:
-                # Last word in the phrase
-                if chunk_idx < len(chunks) - 1:
-                    # Not the last phrase - end when next phrase starts
-                    next_phrase_start = chunks[chunk_idx + 1][0]['start']
-                    end_time = format_time_ass(next_phrase_start)
-                else:
-                    # Last phrase - end when the word ends
-                    end_time = format_time_ass(word['end'])
+    if first is None:
+        raise ValueError("No valid subtitle data found in text file. Please check the format.")
 
-            events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{text}")
+    outputs = {"ass": ass_path}
+    for fmt in extra_formats:
+        outputs[fmt] = os.path.splitext(ass_path)[0] + f".{fmt}"
+    write_chunks(chunks, outputs)
 
-    with open(ass_path, 'w', encoding='utf-8') as f:
-        f.write(ass_header)
-        f.write('\n'.join(events))
-    
     print(f"✅ Regenerated ASS file: {ass_path}")
 
+def get_words_path(ass_path):
+    """Sidecar with the recognizer's raw word timings: subtitles.ass -> subtitles.words.json"""
+    return os.path.splitext(ass_path)[0] + ".words.json"
+
+def save_words(words_path, words, audio_path, model_path):
+    """Store timed words with the audio hash and model they came from.
+
+    Words are [word, start, end] lists with millisecond times, which keeps
+    the file small and lets it be reloaded without rerunning recognition.
+    """
+    sidecar = {
+        "version": WORDS_VERSION,
+        "audio_sha256": hash_file(audio_path),
+        "model": os.path.abspath(model_path),
+        "words": [[w.word, round(w.start, 3), round(w.end, 3)] for w in words],
+    }
+    tmp_path = f"{words_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, words_path)
+
+def load_words(words_path, audio_path=None, model_path=None):
+    """Load timed words saved by save_words.
+
+    Raises ValueError if the sidecar is missing, or was made from a different
+    audio file or model than the ones given.
+    """
+    try:
+        with open(words_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"Word timings not found: {words_path}. Generate subtitles first.")
+    if sidecar.get("version") != WORDS_VERSION:
+        raise ValueError(f"Word timings in {words_path} are from an older version. Generate subtitles again.")
+    if audio_path is not None and sidecar["audio_sha256"] != hash_file(audio_path):
+        raise ValueError(f"Word timings in {words_path} are for a different audio file. Generate subtitles again.")
+    if model_path is not None and sidecar["model"] != os.path.abspath(model_path):
+        raise ValueError(f"Word timings in {words_path} came from the model {sidecar['model']}, not {model_path}")
+    return [Word(*word) for word in sidecar["words"]]
+
+def rechunk_ass_from_words(ass_path, max_words_per_chunk=4, pause=PAUSE_SECONDS, audio_path=None,
+                           generate_txt=True, extra_formats=()):
+    """Rebuild the ASS (plus TXT/SRT/VTT) from the word timings sidecar, without speech recognition"""
+    words_path = get_words_path(ass_path)
+    words = load_words(words_path, audio_path)
+    outputs = {"ass": ass_path}
+    if generate_txt:
+        outputs["txt"] = ass_path.replace('.ass', '.txt')
+    for fmt in extra_formats:
+        outputs[fmt] = os.path.splitext(ass_path)[0] + f".{fmt}"
+    chunks = list(iter_phrase_chunks(words, max_words_per_chunk, pause))
+    write_chunks(chunks, outputs)
+    print(f"✅ Re-chunked {len(words)} words into {len(chunks)} phrases: {ass_path}")
+    return ass_path
+
 def generate_readable_subtitles(chunks, txt_path):
     """Generate a human-readable text file with timing information"""
-    with open(txt_path, 'w', encoding='utf-8') as f:
-        f.write("SUBTITLE TRANSCRIPT WITH TIMING\n")
-        f.write("=" * 50 + "\n\n")
-        f.write("INSTRUCTIONS FOR EDITING:\n")
-        f.write("- Edit the 'Text:' lines to change subtitle content\n")
-        f.write("- Keep the timing format: [MM:SS - MM:SS]\n")
-        f.write("- After editing, run: python generate_subs.py --regenerate-from-txt\n")
-        f.write("=" * 50 + "\n\n")
-        
-        for chunk_idx, chunk in enumerate(chunks):
-            phrase_words = [w['word'] for w in chunk]
-            phrase_text = ' '.join(phrase_words)
-            
-            # Get timing for the phrase
-            start_time = format_time_readable(chunk[0]['start'])
-            end_time = format_time_readable(chunk[-1]['end'])
-            
-            f.write(f"Phrase {chunk_idx + 1}: [{start_time} - {end_time}]\n")
-            f.write(f"Text: {phrase_text}\n")
-            f.write("-" * 30 + "\n")
-            
-            # Show individual words with timing
-            for i, word in enumerate(chunk):
-                word_start = format_time_readable(word['start'])
-                word_end = format_time_readable(word['end'])
-                f.write(f"  Word {i+1}: [{word_start}-{word_end}] {word['word']}\n")
-            f.write("\n")
-
-def generate_ass_subtitles(audio_path, ass_path, model_path=None, max_words_per_chunk=4, generate_txt=True):
-    # Use absolute path for model if not provided
-    if model_path is None:
-        model_path = str(pathlib.Path(__file__).parent / "vosk-model-hi-0.22")
-    model = Model(model_path)
-    wf = wave.open(audio_path, "rb")
-    rec = KaldiRecognizer(model, wf.getframerate())
+    write_chunks(chunks, {"txt": txt_path})
+
+def decode_pcm(audio_path):
+    """Decode a whole audio file into a 16 kHz mono int16 array"""
+    # One growing buffer that the array shares, instead of chunks plus their join
+    pcm = bytearray()
+    for data in stream_pcm(audio_path):
+        pcm += data
+    return np.frombuffer(pcm, dtype=np.int16)
+
+def find_silences(samples, min_silence=0.3, threshold_db=-40.0, window=0.02):
+    """Find silent stretches in 16 kHz PCM.
+
+    Returns (start, end) sample offsets of every run of `window`-sized frames
+    whose RMS level is below threshold_db (dBFS) for at least min_silence
+    seconds.
+    """
+    window_samples = int(SAMPLE_RATE * window)
+    frame_count = len(samples) // window_samples
+    if frame_count == 0:
+        return []
+    frames = samples[:frame_count * window_samples].astype(np.float32).reshape(frame_count, window_samples)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1)) / 32768.0
+    quiet = rms < 10 ** (threshold_db / 20)
+
+    # Rising and falling edges of the quiet mask give the silent runs
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], quiet.astype(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2]
+    long_enough = (ends - starts) * window >= min_silence
+    return [(int(start) * window_samples, int(end) * window_samples)
+            for start, end in zip(starts[long_enough], ends[long_enough])]
+
+def split_at_silences(samples, target_seconds=TARGET_SEGMENT_SECONDS):
+    """Split PCM into (start, end) sample ranges, cutting only in the middle of silences"""
+    target = int(target_seconds * SAMPLE_RATE)
+    segments = []
+    segment_start = 0
+    for silence_start, silence_end in find_silences(samples):
+        cut = (silence_start + silence_end) // 2
+        if cut - segment_start >= target:
+            segments.append((segment_start, cut))
+            segment_start = cut
+    segments.append((segment_start, len(samples)))
+    return segments
+
+def find_speech(samples, min_silence=SKIP_SILENCE_SECONDS, padding=SPEECH_PADDING_SECONDS):
+    """Energy-based voice activity detection over 16 kHz PCM.
+
+    Returns (start, end) sample ranges that may contain speech: everything
+    except silences of at least min_silence seconds, shrunk by `padding` on
+    each side. Intros, outros and long pauses fall out of the ranges.
+    """
+    pad = int(padding * SAMPLE_RATE)
+    regions = []
+    speech_start = 0
+    for silence_start, silence_end in find_silences(samples, min_silence):
+        if silence_start > speech_start:
+            regions.append((max(0, speech_start - pad), silence_start + pad))
+        speech_start = silence_end
+    if speech_start < len(samples):
+        regions.append((max(0, speech_start - pad), len(samples)))
+    return regions
+
+def stream_speech(chunks, min_silence=SKIP_SILENCE_SECONDS, padding=SPEECH_PADDING_SECONDS, threshold_db=-40.0,
+                  window=0.02, stats=None):
+    """find_speech over PCM chunks as they are decoded, without holding the whole file.
+
+    Yields (region, start sample, PCM bytes) pieces covering the same ranges
+    find_speech returns. Pieces of one region are contiguous; a new region
+    number means a long silence was skipped before it. The partial frame
+    and the current quiet run are carried across chunk boundaries. If
+    `stats` is a dict, it is filled with the total and skipped seconds and
+    the number of regions once the chunks run out.
+    """
+    window_bytes = int(SAMPLE_RATE * window) * 2
+    pad_bytes = int(padding * SAMPLE_RATE) * 2
+    threshold = 10 ** (threshold_db / 20)
+    position = 0            # Byte offset of the next whole frame
+    pending = b""           # Partial frame left over from the last chunk
+    run = bytearray()       # The quiet run so far; only its last pad_bytes once it is a long silence
+    run_start = run_frames = speech_start = 0
+    skipping = False
+    region = 0
+    kept = 0
+    regions = set()
+    pieces = []
+
+    def emit(start, pcm):
+        if not pcm:
+            return
+        if pieces and pieces[-1][0] == region:
+            pieces[-1][2] += pcm
+        else:
+            pieces.append([region, start // 2, bytearray(pcm)])
+
+    for chunk in itertools.chain(chunks, [b""]):
+        data = pending + chunk
+        frame_count = len(data) // window_bytes
+        if frame_count:
+            frames = np.frombuffer(data, dtype=np.int16, count=frame_count * window_bytes // 2)
+            frames = frames.astype(np.float32).reshape(frame_count, window_bytes // 2)
+            quiet = np.sqrt(np.mean(frames ** 2, axis=1)) / 32768.0 < threshold
+            bounds = [0] + list(np.flatnonzero(np.diff(quiet)) + 1) + [frame_count]
+            for first, last in zip(bounds, bounds[1:]):
+                start = position + first * window_bytes
+                segment = data[first * window_bytes:last * window_bytes]
+                if quiet[first]:
+                    if not run_frames:
+                        run_start = start
+                    run_frames += last - first
+                    run += segment
+                    if skipping:
+                        del run[:len(run) - pad_bytes]
+                    elif run_frames * window >= min_silence:
+                        # A long silence: its first pad_bytes close the current region
+                        if run_start > speech_start:
+                            emit(run_start, run[:pad_bytes])
+                        region += 1
+                        skipping = True
+                        del run[:len(run) - pad_bytes]
+                else:
+                    if skipping:
+                        # Speech again; the region opens pad_bytes before it
+                        skipping = False
+                        speech_start = start
+                        emit(start - len(run), run)
+                    elif run_frames:
+                        emit(run_start, run)
+                    run = bytearray()
+                    run_frames = 0
+                    emit(start, segment)
+            position += frame_count * window_bytes
+        pending = data[frame_count * window_bytes:]
+        if not chunk:
+            # End of the audio: the partial frame counts as speech, as in find_silences
+            if skipping:
+                if pending:
+                    emit(position - len(run), run + pending)
+            else:
+                if run_frames:
+                    emit(run_start, run)
+                emit(position, pending)
+            position += len(pending)
+        for piece in pieces:
+            regions.add(piece[0])
+            kept += len(piece[2])
+            yield piece[0], piece[1], bytes(piece[2])
+        pieces.clear()
+    if stats is not None:
+        stats.update(total_seconds=position / 2 / SAMPLE_RATE, skipped_seconds=(position - kept) / 2 / SAMPLE_RATE,
+                     regions=len(regions))
+
+def silence_report(stats):
+    """One-line summary of the silence skipped by plan_segments or stream_speech"""
+    total = stats["total_seconds"]
+    skipped = stats["skipped_seconds"]
+    return (f"🔇 Skipping {skipped:.1f}s of {total:.1f}s audio as silence "
+            f"({skipped / total if total else 0:.0%}), {stats['regions']} speech regions")
+
+def plan_segments(samples, target_seconds=None, skip_silence=True, stats=None):
+    """Sample ranges to recognize: speech regions, split at silences to about target_seconds if given"""
+    regions = find_speech(samples) if skip_silence else [(0, len(samples))]
+    if target_seconds is None:
+        segments = regions
+    else:
+        segments = []
+        for region_start, region_end in regions:
+            for start, end in split_at_silences(samples[region_start:region_end], target_seconds):
+                segments.append((region_start + start, region_start + end))
+    if skip_silence and stats is not None:
+        stats.update(total_seconds=len(samples) / SAMPLE_RATE, regions=len(regions),
+                     skipped_seconds=(len(samples) - sum(end - start for start, end in segments)) / SAMPLE_RATE)
+    return segments
+
+def _result_words(result_json, offset):
+    for word in json.loads(result_json).get('result', ()):
+        yield Word(word['word'], word['start'] + offset, word['end'] + offset)
+
+def recognize_chunks(model, chunks, offset=0.0):
+    """Run a recognizer over PCM chunks, yielding timed words as they are recognized.
+
+    Word times are shifted by `offset` seconds so segments recognized on
+    their own land on the global timeline.
+    """
+    rec = KaldiRecognizer(model, SAMPLE_RATE)
     rec.SetWords(True)
 
-    results = []
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
+    for data in chunks:
         if rec.AcceptWaveform(data):
-            results.append(json.loads(rec.Result()))
-    results.append(json.loads(rec.FinalResult()))
-
-    # Collect all words with timing
-    all_words = []
-    for r in results:
-        if 'result' not in r:
-            continue
-        all_words.extend(r['result'])
-
-    # Create phrase chunks
-    chunks = create_phrase_chunks(all_words, max_words_per_chunk)
-
+            yield from _result_words(rec.Result(), offset)
+    yield from _result_words(rec.FinalResult(), offset)
+
+# Model loaded once per worker process by _init_worker
+_worker_model = None
+
+def _init_worker(model_path, model_class=None, recognizer_class=None):
+    global _worker_model, Model, KaldiRecognizer
+    # Spawned workers re-import this module; take the parent's classes so a
+    # replaced recognizer (the benchmark's stub) is used there too
+    if model_class is not None:
+        Model, KaldiRecognizer = model_class, recognizer_class
+    _worker_model = Model(model_path)
+
+def _pcm_chunks(pcm):
+    return (pcm[i:i + PCM_CHUNK_BYTES] for i in range(0, len(pcm), PCM_CHUNK_BYTES))
+
+def _recognize_segment(pcm, offset):
+    return list(recognize_chunks(_worker_model, _pcm_chunks(pcm), offset))
+
+def transcribe_words(audio_path, model_path, workers=1, model=None, skip_silence=True, stats=None):
+    """Yield Vosk's timed words for an audio file, in timeline order.
+
+    With skip_silence, long silences found by find_speech are never fed to
+    the recognizer; each speech region is recognized on its own and its
+    words are shifted back to their place on the timeline. A single worker
+    finds the regions while the audio streams in (stream_speech), so the
+    decoded file is never held in memory. How much was skipped is printed,
+    or stored in `stats` if a dict is given. With workers > 1
+    the audio is also split at shorter silences and the segments are
+    recognized in a process pool (each worker loads its own copy of the
+    model), then merged back in timeline order. When an already loaded
+    `model` is passed, it is used directly and segments are recognized on
+    threads that share it instead.
+    """
+    if workers <= 1 and not skip_silence:
+        yield from recognize_chunks(model or Model(model_path), stream_pcm(audio_path))
+        return
+
+    report = {} if stats is None else stats
+    if workers <= 1:
+        model = model or Model(model_path)
+        pieces = stream_speech(stream_pcm(audio_path), stats=report)
+        for _, region in itertools.groupby(pieces, key=lambda piece: piece[0]):
+            _, start, pcm = next(region)
+            chunks = itertools.chain([pcm], (pcm for _, _, pcm in region))
+            yield from recognize_chunks(model, chunks, start / SAMPLE_RATE)
+        if stats is None:
+            print(silence_report(report))
+        return
+
+    samples = decode_pcm(audio_path)
+    duration = len(samples) / SAMPLE_RATE
+    target = min(TARGET_SEGMENT_SECONDS, max(duration / workers, 1.0))
+    segments = plan_segments(samples, target, skip_silence, report)
+    if skip_silence and stats is None:
+        print(silence_report(report))
+    if not segments:
+        return
+    print(f"🎙️  Recognizing {len(segments)} segments with {workers} workers...")
+
+    max_workers = min(workers, len(segments))
+    if model is not None:
+        # Vosk releases the GIL while decoding, so threads can share one model
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+
+        def task(pcm, offset):
+            return list(recognize_chunks(model, _pcm_chunks(pcm), offset))
+    else:
+        pool = ProcessPoolExecutor(max_workers=max_workers,
+                                   initializer=_init_worker,
+                                   initargs=(model_path, Model, KaldiRecognizer))
+        task = _recognize_segment
+    with pool:
+        futures = [
+            pool.submit(task, samples[start:end].tobytes(), start / SAMPLE_RATE)
+            for start, end in segments
+        ]
+        for future in futures:
+            yield from future.result()
+
+def transcribe_via_server(audio_path, model_path, workers=1, socket_path=DEFAULT_SOCKET_PATH, skip_silence=True):
+    """Ask a running transcribe_server.py for the timed words of an audio file.
+
+    Returns None when no server is listening so callers can fall back to
+    loading the model in-process.
+    """
+    request = {
+        "audio_path": os.path.abspath(audio_path),
+        "model_path": os.path.abspath(model_path),
+        "workers": workers,
+        "skip_silence": skip_silence,
+    }
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except (AttributeError, OSError):
+        return None
+    with sock:
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        print(f"🔌 Using transcription server at {socket_path}")
+        sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        with sock.makefile('rb') as reader:
+            line = reader.readline()
+    if not line:
+        raise RuntimeError(f"Transcription server at {socket_path} closed the connection")
+    response = json.loads(line)
+    if "error" in response:
+        raise RuntimeError(f"Transcription server failed: {response['error']}")
+    if "silence" in response:
+        print(silence_report(response["silence"]))
+    return [Word(*word) for word in response["words"]]
+
+def generate_ass_subtitles(audio_path, ass_path, model_path=None, max_words_per_chunk=4, generate_txt=True,
+                           workers=1, use_server=True, extra_formats=(), pause=PAUSE_SECONDS, skip_silence=True):
+    """Transcribe audio and stream the phrases into the ASS file (plus TXT/SRT/VTT).
+
+    Words flow from the recognizer through the phrase chunker into the
+    writers as they are produced. The raw word timings are also saved next
+    to the ASS file (see get_words_path), so different chunking settings
+    can be tried later with rechunk_ass_from_words.
+    """
+    # Use absolute path for model if not provided
+    if model_path is None:
+        model_path = DEFAULT_MODEL_PATH
+    all_words = None
+    if use_server:
+        # A running transcribe_server.py already has the model loaded
+        all_words = transcribe_via_server(audio_path, model_path, workers, skip_silence=skip_silence)
+    if all_words is None:
+        all_words = transcribe_words(audio_path, model_path, workers, skip_silence=skip_silence)
+
+    outputs = {"ass": ass_path}
     # Generate readable text file if requested
     if generate_txt:
-        txt_path = ass_path.replace('.ass', '.txt')
-        generate_readable_subtitles(chunks, txt_path)
-        print(f"📝 Readable subtitles saved to: {txt_path}")
-
-    ass_header = '''[Script Info]
-Title: Word Highlight Subtitles
-ScriptType: v4.00+
-WrapStyle: 1
-ScaledBorderAndShadow: yes
-YCbCr Matrix: TV.601
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,Lava Devanagari,35,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,1,0,0,0,100,100,0,0,1,2,1,2,50,50,40,1
-
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-'''
-
-    events = []
-
-    for chunk_idx, chunk in enumerate(chunks):
-        phrase_words = [w['word'] for w in chunk]
-        for i, word in enumerate(chunk):
-            # Build the phrase, highlighting only the current word
-            text_parts = []
-            for j, w in enumerate(chunk):
-                if i == j:
-                    # Highlight current word
-                    text_parts.append(r'{\b1\c&H00FFFF&\3c&H000000&}' + w['word'] + r'{\r}')
-                else:
-                    text_parts.append(w['word'])
-            text = ' '.join(text_parts)
+        outputs["txt"] = ass_path.replace('.ass', '.txt')
+    for fmt in extra_formats:
+        outputs[fmt] = os.path.splitext(ass_path)[0] + f".{fmt}"
+    recognized = []
 
-            # Start time: current word start
-            start_time = format_time_ass(word['start'])
+    def keep_words(words):
+        for word in words:
+            recognized.append(word)
+            yield word
 
-            # End time: next word start (or next phrase start if last word)
-            if i < len(chunk) - 1:
-                # Not the last word - end when next word starts
-                end_time = format_time_ass(chunk[i + 1]['start'])
-            else:
-                # Last word in the phrase
-                if chunk_idx < len(chunks) - 1:
-                    # Not the last phrase - end when next phrase starts
-                    next_phrase_start = chunks[chunk_idx + 1][0]['start']
-                    end_time = format_time_ass(next_phrase_start)
-                else:
-                    # Last phrase - end when the word ends
-                    end_time = format_time_ass(word['end'])
+    write_subtitles(keep_words(all_words), outputs, max_words_per_chunk, pause)
+    save_words(get_words_path(ass_path), recognized, audio_path, model_path)
 
-            events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{text}")
-
-    with open(ass_path, 'w', encoding='utf-8') as f:
-        f.write(ass_header)
-        f.write('\n'.join(events))
+    if generate_txt:
+        print(f"📝 Readable subtitles saved to: {outputs['txt']}")
 
     return ass_path
 
@@ -293,20 +539,37 @@ if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Generate subtitles from audio file")
-    parser.add_argument("audio_path", nargs='?', help="Path to the audio file (WAV format)")
+    parser.add_argument("audio_path", nargs='?', help="Path to the audio file (MP3, WAV or anything ffmpeg can decode)")
     parser.add_argument("output_path", nargs='?', help="Path for the output ASS subtitle file")
     parser.add_argument("--model-path", help="Path to Vosk model directory")
     parser.add_argument("--max-words", type=int, default=4, help="Maximum words per chunk")
+    parser.add_argument("--pause", type=float, default=PAUSE_SECONDS,
+                        help="Start a new chunk after a gap between words longer than this many seconds")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Recognize silence-separated segments in this many processes (each loads the model)")
+    parser.add_argument("--keep-silence", action="store_true",
+                        help="Feed long silences to the recognizer too instead of skipping them")
     parser.add_argument("--no-txt", action="store_true", help="Don't generate readable text file")
+    parser.add_argument("--no-server", action="store_true",
+                        help="Always load the model in-process, even if transcribe_server.py is running")
     parser.add_argument("--regenerate-from-txt", help="Regenerate ASS file from edited text file")
+    parser.add_argument("--rechunk", metavar="ASS_PATH",
+                        help="Rebuild this ASS file from its saved word timings with new --max-words/--pause, without recognition")
+    parser.add_argument("--srt", action="store_true", help="Also write an SRT file next to the ASS file")
+    parser.add_argument("--vtt", action="store_true", help="Also write a WebVTT file next to the ASS file")
     
     args = parser.parse_args()
+    extra_formats = [fmt for fmt in ("srt", "vtt") if getattr(args, fmt)]
     
     if args.regenerate_from_txt:
         # Regenerate ASS from edited text file
         txt_path = args.regenerate_from_txt
         ass_path = txt_path.replace('.txt', '.ass')
-        regenerate_ass_from_edited_txt(txt_path, ass_path)
+        regenerate_ass_from_edited_txt(txt_path, ass_path, extra_formats)
+    elif args.rechunk:
+        # Re-chunk from the word timings sidecar; checked against the audio when it is given
+        rechunk_ass_from_words(args.rechunk, args.max_words, args.pause, args.audio_path,
+                               generate_txt=not args.no_txt, extra_formats=extra_formats)
     elif args.audio_path and args.output_path:
         # Normal subtitle generation
         generate_ass_subtitles(
@@ -314,7 +577,12 @@ if __name__ == "__main__":
             args.output_path, 
             args.model_path, 
             args.max_words,
-            generate_txt=not args.no_txt
+            generate_txt=not args.no_txt,
+            workers=args.workers,
+            use_server=not args.no_server,
+            extra_formats=extra_formats,
+            pause=args.pause,
+            skip_silence=not args.keep_silence
         )
     else:
         parser.print_help() 
\ No newline at end of file
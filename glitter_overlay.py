@@ -0,0 +1,82 @@
+import os
+import tempfile
+from collections import namedtuple
+
+from clip_cache import ClipCache
+from instrument import run_command
+
+FFMPEG = "/opt/homebrew/bin/ffmpeg"
+
+DEFAULT_OVERLAY_DIR = os.environ.get(
+    "VIDEO_JOINER_OVERLAY_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "video-joiner", "overlays"),
+)
+DEFAULT_OPACITY = 0.6
+
+# A sparkle video (e.g. glitter_8x.mp4) screen-blended over the whole timeline
+GlitterOverlay = namedtuple("GlitterOverlay", ["path", "opacity"])
+
+def prepare_overlay(glitter_path, width, height, fps, cache_dir=DEFAULT_OVERLAY_DIR):
+    """Scale and crop the sparkle loop to the output size once, and cache it.
+
+    Returns the cached file's path. Later renders at the same size and frame
+    rate loop it directly, so the encode never rescales the overlay per frame.
+    """
+    cache = ClipCache(cache_dir, 2 * 1024 ** 3)
+    key = cache.key(glitter_path, kind="glitter", width=width, height=height, fps=fps)
+    cached = cache.path_for(key)
+    if os.path.exists(cached):
+        os.utime(cached)
+        return cached
+
+    print(f"✨ Pre-scaling glitter overlay to {width}x{height} at {fps} fps...")
+    with tempfile.TemporaryDirectory() as work_dir:
+        scaled = os.path.join(work_dir, "glitter.mp4")
+        run_command([
+            FFMPEG, "-y",
+            "-i", glitter_path,
+            "-vf", f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},fps={fps}",
+            "-an",
+            "-c:v", "libx264",
+            "-preset", "fast",
+            "-crf", "18",
+            "-pix_fmt", "yuv420p",
+            scaled
+        ], "Pre-scaling glitter overlay")
+        cache.store(key, scaled)
+    return cached
+
+def overlay_input_args(overlay_path):
+    """Loop the prepared overlay for as long as the video runs"""
+    return ["-stream_loop", "-1", "-i", overlay_path]
+
+def build_overlay_filter(base_label, input_index, opacity, out_label="[glitter]"):
+    """Screen-blend input `input_index` over `base_label`.
+
+    Screen only ever brightens, so the black background of a sparkle video
+    leaves the picture untouched. Blending happens in RGB so the sparkles
+    keep their colour. The overlay is looped, so the base decides the length.
+    """
+    return (
+        f"{base_label}format=gbrp[glitter_base];"
+        f"[{input_index}:v]format=gbrp,setpts=PTS-STARTPTS[glitter_src];"
+        f"[glitter_base][glitter_src]blend=all_mode=screen:all_opacity={opacity}:shortest=1{out_label}"
+    )
+
+def add_glitter(video_path, glitter_path, output_path, width, height, fps, opacity=DEFAULT_OPACITY):
+    """Blend the sparkle overlay over a finished video, copying its audio"""
+    overlay = prepare_overlay(glitter_path, width, height, fps)
+    filter_graph = build_overlay_filter("[0:v]", 1, opacity) + ";[glitter]format=yuv420p[v]"
+    run_command([
+        FFMPEG, "-y",
+        "-i", video_path,
+    ] + overlay_input_args(overlay) + [
+        "-filter_complex", filter_graph,
+        "-map", "[v]",
+        "-map", "0:a?",
+        "-c:v", "libx264",
+        "-preset", "fast",
+        "-crf", "18",
+        "-c:a", "copy",
+        output_path
+    ], "Adding glitter overlay")
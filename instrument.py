@@ -0,0 +1,145 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from tqdm import tqdm
+
+class Trace:
+    """Collects stage, clip and subprocess timings for one run.
+
+    Events are kept in memory and written to `path` as JSON by save(), so
+    tracing costs nothing beyond a few dicts when no trace file is wanted.
+    """
+
+    def __init__(self, path=None, progress=True):
+        self.path = path
+        self.progress = progress
+        self.events = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def record(self, kind, name, **fields):
+        event = {"kind": kind, "name": name, "at": round(time.perf_counter() - self._start, 3), **fields}
+        with self._lock:
+            self.events.append(event)
+        return event
+
+    @contextmanager
+    def stage(self, name):
+        """Time a pipeline stage, recording it even when it fails"""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.record("stage", name, seconds=round(seconds, 3), status=status)
+            print(f"⏱️  {name}: {seconds:.1f}s")
+
+    def bar(self, total, desc, unit):
+        """A tqdm progress bar, or a silent one when progress output is off"""
+        return tqdm(total=total, desc=desc, unit=unit, disable=not self.progress, leave=False, file=sys.stderr)
+
+    def save(self):
+        if self.path is None:
+            return
+        stages = {e["name"]: e["seconds"] for e in self.events if e["kind"] == "stage"}
+        processes = [e for e in self.events if e["kind"] == "process"]
+        summary = {
+            "wall_seconds": round(time.perf_counter() - self._start, 3),
+            "stages": stages,
+            "process_cpu_seconds": round(sum(e["cpu_user"] + e["cpu_system"] for e in processes), 2),
+            "process_peak_rss_mb": max((e["max_rss_mb"] for e in processes), default=0),
+        }
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"summary": summary, "events": self.events}, f, indent=2)
+        print(f"📈 Trace written to {self.path}")
+
+# The active trace. make_video.py replaces it from --trace; library callers
+# get an in-memory trace with progress bars.
+trace = Trace()
+
+def start_trace(path=None, progress=True):
+    global trace
+    trace = Trace(path, progress)
+    return trace
+
+def max_rss_mb(usage):
+    """Peak RSS in MB from a getrusage()/wait4() result"""
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return usage.ru_maxrss / 1024 / 1024 if sys.platform == "darwin" else usage.ru_maxrss / 1024
+
+def wait_process(proc, label, started, **fields):
+    """Reap a Popen with wait4 and record its CPU time and peak RSS"""
+    _, status, usage = os.wait4(proc.pid, 0)
+    # Tell Popen the child is gone so it never tries to wait for it again
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    trace.record(
+        "process", label,
+        seconds=round(time.perf_counter() - started, 3),
+        cpu_user=round(usage.ru_utime, 3),
+        cpu_system=round(usage.ru_stime, 3),
+        max_rss_mb=round(max_rss_mb(usage), 1),
+        returncode=proc.returncode,
+        **fields,
+    )
+    return proc.returncode
+
+def read_stderr_tail(stderr_file, lines=10):
+    stderr_file.seek(0)
+    text = stderr_file.read().decode('utf-8', 'replace').strip()
+    return "\n".join(text.splitlines()[-lines:])
+
+def run_command(cmd, label, total_frames=None, progress_desc=None, stdout=None):
+    """Run a subprocess, keeping its stderr and recording its resource usage.
+
+    For ffmpeg commands pass total_frames: `-progress` output is parsed for
+    frame count and speed, which drive a progress bar with ETA when
+    progress_desc is given. Otherwise the command's output goes to the
+    `stdout` file (e.g. a pipe) or is discarded. Raises RuntimeError with
+    the last stderr lines if the command fails.
+    """
+    if total_frames is not None:
+        cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + cmd[1:]
+    started = time.perf_counter()
+    stats = {}
+    # stderr goes to a file so a chatty process can never block on a full pipe
+    with tempfile.TemporaryFile() as stderr_file:
+        if total_frames is not None:
+            stdout = subprocess.PIPE
+        elif stdout is None:
+            stdout = subprocess.DEVNULL
+        proc = subprocess.Popen(cmd, stdout=stdout, stderr=stderr_file, text=True)
+        if total_frames is not None:
+            with trace.bar(total_frames, progress_desc or label, "frame") if progress_desc else _no_bar() as bar:
+                for line in proc.stdout:
+                    key, _, value = line.strip().partition("=")
+                    if key == "frame" and value.isdigit():
+                        frame = int(value)
+                        if bar is not None:
+                            bar.update(frame - bar.n)
+                        stats["frames"] = frame
+                    elif key == "speed" and value.endswith("x"):
+                        try:
+                            stats["speed"] = float(value[:-1])
+                        except ValueError:
+                            pass
+            proc.stdout.close()
+        returncode = wait_process(proc, label, started, **stats)
+        if returncode != 0:
+            stderr_tail = read_stderr_tail(stderr_file)
+            trace.record("error", label, stderr=stderr_tail)
+            raise RuntimeError(f"{label} failed (exit code {returncode}):\n{stderr_tail}")
+    return stats
+
+@contextmanager
+def _no_bar():
+    yield None
@@ -1,8 +1,9 @@
 from manim import *
 
 # Set custom config BEFORE defining the scene
-config.pixel_height = 1920
-config.pixel_width = 1080
+config.pixel_height = {{PIXEL_HEIGHT}}
+config.pixel_width = {{PIXEL_WIDTH}}
+config.frame_rate = {{FPS}}
 config.frame_height = 14.4  # default height in manim units
 config.frame_width = config.pixel_width * config.frame_height / config.pixel_height
 
@@ -1,78 +1,374 @@
 import os
-import subprocess
+import json
+import math
 import shutil
+import hashlib
 from mutagen.mp3 import MP3
 import argparse
 import re
 import pathlib
-from generate_subs import generate_ass_subtitles, regenerate_ass_from_edited_txt
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import instrument
+from generate_subs import (generate_ass_subtitles, get_words_path, rechunk_ass_from_words,
+                           regenerate_ass_from_edited_txt, DEFAULT_MODEL_PATH)
+from subtitle_engine import PAUSE_SECONDS
+from build_graph import BuildGraph
+from clip_cache import ClipCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from clip_queue import ClipQueue, LEASE_SECONDS, render_queued
+from segment_encode import SegmentedEncoder, encode_segmented
+from numpy_ken_burns import render_ken_burns_clip, write_timeline, START_SCALE, END_SCALE, SHIFT_UP_UNITS, FRAME_HEIGHT_UNITS
+from image_prep import prepare_images
+from glitter_overlay import GlitterOverlay, DEFAULT_OPACITY, build_overlay_filter, overlay_input_args, prepare_overlay
+from render_profiles import (PROFILES, DEFAULT_PROFILE, RENDITIONS, encoder_args, get_profile, lossless_profile,
+                             preview_profile, rendition_profile)
 
 FFMPEG = "/opt/homebrew/bin/ffmpeg"
 
+# Python of the virtual environment Manim is installed in
+MANIM_PYTHON = str(pathlib.Path(__file__).parent / "env" / "bin" / "python")
+
+FADE_DURATION = 1.0  # seconds of fade in/out per image
+
+# Single-pass mode zooms over a still this many times the output size
+ZOOMPAN_OVERSAMPLE = 2
+
+# Most clips (ffmpeg inputs) assembled in one filter graph; longer timelines go in chunks
+MAX_GRAPH_INPUTS = 32
+
+# How clips reach the final encode:
+# - h264: clip files encoded with the render profile's settings
+# - lossless: clip files in lossless H.264, faster to write, no second generation loss
+# - pipe: no clip files; raw frames go through a named pipe into the final encoder
+INTERMEDIATES = ("h264", "lossless", "pipe")
+
+# Render settings of the video modes, passed through as one value (see main() for each field)
+RenderOptions = namedtuple("RenderOptions", [
+    "jobs", "cache", "backend", "single_pass", "segmented", "profile", "glitter", "prep_images", "force",
+    "intermediate", "temp_root", "queue", "renditions",
+], defaults=[None, None, "manim", False, False, None, None, True, False, "h264", None, None, ()])
+
+def get_fade_duration(per_image_duration):
+    """Fade length per image; images shorter than two fades fade over half their length"""
+    return min(FADE_DURATION, per_image_duration / 2)
+
 def get_audio_duration(audio_path):
     audio = MP3(audio_path)
     return audio.info.length
 
-def generate_clip_commands(images, per_image_duration, temp_dir):
-    clips = []
-    # Read the existing ken_burns.py template
-    template_path = pathlib.Path(__file__).parent / "ken_burns.py"
+def render_manim_clip(index, img, per_image_duration, temp_dir, template_content, profile):
+    """Render a single Ken Burns clip with Manim in its own media directory"""
+    out = os.path.join(temp_dir, f"clip_{index}.mp4")
+    # Each job gets a private media dir so concurrent Manim runs never share
+    # partial movie files or cache entries
+    media_dir = os.path.join(temp_dir, f"media_{index}")
+
+    # Create a temporary Manim scene file by replacing placeholders
+    scene_content = template_content.replace(
+        "{{IMAGE_PATH}}", img
+    ).replace(
+        "{{RUN_TIME}}", str(per_image_duration)
+    ).replace(
+        "{{PIXEL_WIDTH}}", str(profile.width)
+    ).replace(
+        "{{PIXEL_HEIGHT}}", str(profile.height)
+    ).replace(
+        "{{FPS}}", str(profile.fps)
+    )
+
+    # Write the temporary scene file
+    scene_file = os.path.join(temp_dir, f"scene_{index}.py")
+    with open(scene_file, 'w') as f:
+        f.write(scene_content)
+
+    # Run Manim to generate the clip using the virtual environment's python
+    cmd = [
+        MANIM_PYTHON, "-m", "manim", "-qh", scene_file, "KenBurnsEffect",
+        "--media_dir", media_dir,
+        "--output_file", f"clip_{index}.mp4"
+    ]
+
+    instrument.run_command(cmd, f"Manim clip {index} ({img})")
+
+    # Find the generated video file in Manim's output structure
+    generated_video = os.path.join(media_dir, "videos", f"scene_{index}", f"{profile.height}p{profile.fps}", f"clip_{index}.mp4")
+    if os.path.exists(generated_video):
+        # Move to our desired output name; media_dir is inside temp_dir, so this is a rename
+        os.replace(generated_video, out)
+    else:
+        raise RuntimeError(f"Generated video not found at expected location: {generated_video}")
+
+    shutil.rmtree(media_dir, ignore_errors=True)
+    return out
+
+def render_numpy_clip(index, img, per_image_duration, temp_dir, template_content, profile):
+    """Render a single Ken Burns clip in-process with the NumPy renderer"""
+    out = os.path.join(temp_dir, f"clip_{index}.mp4")
+    render_ken_burns_clip(img, out, per_image_duration, profile.width, profile.height, profile.fps,
+                          profile.preset, profile.crf, profile.pix_fmt)
+    return out
+
+def render_manim_batch(indices, images, per_image_duration, temp_dir, template_content, profile):
+    """Render several clips in one Manim process (see manim_batch.py).
+
+    Manim is imported once for the whole shard and writes each clip straight
+    to temp_dir/clip_i.mp4. Returns {index: error message or None}.
+    """
+    jobs_path = os.path.join(temp_dir, f"manim_batch_{indices[0]}.json")
+    results_path = os.path.join(temp_dir, f"manim_batch_{indices[0]}_results.json")
+    batch = {
+        "template": template_content,
+        "profile": profile._asdict(),
+        "jobs": [{
+            "index": i,
+            "image": images[i],
+            "run_time": per_image_duration,
+            "output": os.path.join(temp_dir, f"clip_{i}.mp4"),
+            "work_dir": os.path.join(temp_dir, f"media_{i}"),
+        } for i in indices],
+    }
+    with open(jobs_path, 'w', encoding='utf-8') as f:
+        json.dump(batch, f)
+
+    script = str(pathlib.Path(__file__).parent / "manim_batch.py")
+    instrument.run_command([MANIM_PYTHON, script, jobs_path, results_path], f"Manim batch of {len(indices)} clips")
+    with open(results_path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    return {int(i): error for i, error in results.items()}
+
+# Clip backends: the render function and the source file that defines its output.
+# The source file's contents are part of the clip cache key.
+CLIP_BACKENDS = {
+    "manim": (render_manim_clip, "ken_burns.py"),
+    "manim-batch": (render_manim_batch, "ken_burns.py"),
+    "numpy": (render_numpy_clip, "numpy_ken_burns.py"),
+}
+
+# Backends whose render function takes a shard of clip indices instead of one clip
+BATCH_BACKENDS = {"manim-batch"}
+
+def clip_profile(profile, backend="manim", intermediate="h264"):
+    """Render profile the intermediate clips are encoded with"""
+    if intermediate not in INTERMEDIATES:
+        raise ValueError(f"Unknown intermediate: {intermediate} (choose from {', '.join(INTERMEDIATES)})")
+    profile = get_profile(profile)
+    if intermediate == "h264":
+        return profile
+    if backend != "numpy":
+        # Manim encodes its clips itself with its own settings
+        raise ValueError(f"The {intermediate} intermediate needs the numpy backend")
+    return lossless_profile(profile)
+
+def render_cached_clip(render, index, img, per_image_duration, temp_dir, template_content, profile, cache, key):
+    """Render a clip and add it to the cache once it has rendered successfully"""
+    start = time.perf_counter()
+    out = render(index, img, per_image_duration, temp_dir, template_content, profile)
+    instrument.trace.record("clip", f"clip_{index}", image=img, seconds=round(time.perf_counter() - start, 3))
+    if cache is not None:
+        cache.store(key, out)
+    return out
+
+def render_cached_batch(render, indices, images, per_image_duration, temp_dir, template_content, profile, cache,
+                        keys):
+    """Render a shard with a batch backend; returns {index: clip path or exception}"""
+    start = time.perf_counter()
+    errors = render(indices, images, per_image_duration, temp_dir, template_content, profile)
+    outcomes = {}
+    for i in indices:
+        if errors.get(i):
+            outcomes[i] = RuntimeError(errors[i])
+            continue
+        outcomes[i] = os.path.join(temp_dir, f"clip_{i}.mp4")
+        if cache is not None:
+            cache.store(keys[i], outcomes[i])
+    instrument.trace.record("clip batch", f"clips_{indices[0]}", clips=len(indices),
+                            seconds=round(time.perf_counter() - start, 3))
+    return outcomes
+
+def generate_clip_commands(images, per_image_duration, temp_dir, *, jobs=None, cache=None, backend="manim",
+                           profile=None, on_clip=None, queue=None):
+    """Render one Ken Burns clip per image, running up to `jobs` renders at once.
+
+    Clips are returned in image order regardless of completion order. If any
+    image fails, the remaining renders still run to completion so finished
+    clips stay in temp_dir, and a single error listing every failure is raised.
+    When a ClipCache is given, previously rendered clips are reused and new
+    ones are added to it. `backend` selects a renderer from CLIP_BACKENDS;
+    batch backends split the clips into `jobs` shards, one process each.
+    Clips are rendered at the size and frame rate of the render `profile`.
+    `on_clip(index, path)` is called as each clip becomes available.
+    With a ClipQueue, clips missing from the cache are rendered by queue
+    workers (see clip_queue.py) instead of on this machine.
+    """
+    if backend not in CLIP_BACKENDS:
+        raise ValueError(f"Unknown clip backend: {backend}")
+    if queue is not None and backend in BATCH_BACKENDS:
+        raise ValueError(f"The {backend} backend can't render through a clip queue; use manim or numpy")
+    render, source_name = CLIP_BACKENDS[backend]
+    profile = get_profile(profile)
+
+    # Read the backend's template/source (ken_burns.py for Manim)
+    template_path = pathlib.Path(__file__).parent / source_name
     with open(template_path, 'r') as f:
         template_content = f.read()
-    
-    for i, img in enumerate(images):
-        out = os.path.join(temp_dir, f"clip_{i}.mp4")
-        
-        # Create a temporary Manim scene file by replacing placeholders
-        scene_content = template_content.replace(
-            "{{IMAGE_PATH}}", img
-        ).replace(
-            "{{RUN_TIME}}", str(per_image_duration)
-        )
-        
-        # Write the temporary scene file
-        scene_file = os.path.join(temp_dir, f"scene_{i}.py")
-        with open(scene_file, 'w') as f:
-            f.write(scene_content)
-        
-        # Run Manim to generate the clip using the virtual environment's python
-        venv_python = str(pathlib.Path(__file__).parent / "env" / "bin" / "python")
-        cmd = [
-            venv_python, "-m", "manim", "-qh", scene_file, "KenBurnsEffect",
-            "--media_dir", temp_dir,
-            "--output_file", f"clip_{i}.mp4"
-        ]
-        
-        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        if result.returncode != 0:
-            raise RuntimeError(f"Failed to generate clip {i} from {img}")
-        
-        # Find the generated video file in Manim's output structure
-        generated_video = os.path.join(temp_dir, "videos", f"scene_{i}", "1920p60", f"clip_{i}.mp4")
-        if os.path.exists(generated_video):
-            # Copy to our desired output name
-            shutil.copy2(generated_video, out)
+
+    clips = [None] * len(images)
+    keys = [None] * len(images)
+    if cache is not None:
+        template_hash = hashlib.sha256(template_content.encode('utf-8')).hexdigest()
+        for i, img in enumerate(images):
+            keys[i] = cache.key(
+                img,
+                per_image_duration=per_image_duration,
+                backend=backend,
+                template=template_hash,
+                profile=profile._asdict(),
+            )
+            out = os.path.join(temp_dir, f"clip_{i}.mp4")
+            if cache.fetch(keys[i], out):
+                clips[i] = out
+                if on_clip is not None:
+                    on_clip(i, out)
+        hits = sum(clip is not None for clip in clips)
+        instrument.trace.record("cache", "clips", hits=hits, misses=len(images) - hits)
+        print(f"  {hits}/{len(images)} clips reused from cache")
+
+    pending = [i for i, clip in enumerate(clips) if clip is None]
+    if not pending:
+        return clips
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(pending)))
+
+    failures = []
+
+    def finish(i, outcome, bar):
+        if isinstance(outcome, Exception):
+            failures.append((i, outcome))
+            bar.write(f"  ❌ clip_{i} failed")
         else:
-            raise RuntimeError(f"Generated video not found at expected location: {generated_video}")
-        
-        clips.append(out)
+            clips[i] = outcome
+            if on_clip is not None:
+                on_clip(i, outcome)
+
+    if queue is not None:
+        with instrument.trace.bar(len(pending), "Clips", "clip") as bar:
+            for i, outcome in render_queued(queue, pending, images, per_image_duration, temp_dir, backend,
+                                            template_content, profile):
+                if cache is not None and not isinstance(outcome, Exception):
+                    cache.store(keys[i], outcome)
+                finish(i, outcome, bar)
+                bar.update(1)
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as pool, instrument.trace.bar(len(pending), "Clips", "clip") as bar:
+            if backend in BATCH_BACKENDS:
+                futures = {
+                    pool.submit(render_cached_batch, render, shard, images, per_image_duration, temp_dir,
+                                template_content, profile, cache, keys): shard
+                    for shard in (pending[k::jobs] for k in range(jobs))
+                }
+            else:
+                futures = {
+                    pool.submit(render_cached_clip, render, i, images[i], per_image_duration, temp_dir,
+                                template_content, profile, cache, keys[i]): [i]
+                    for i in pending
+                }
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    outcomes = future.result() if backend in BATCH_BACKENDS else {shard[0]: future.result()}
+                except Exception as e:
+                    outcomes = {i: e for i in shard}
+                for i, outcome in outcomes.items():
+                    finish(i, outcome, bar)
+                bar.update(len(shard))
+
+    if failures:
+        failures.sort(key=lambda failure: failure[0])
+        details = "\n".join(f"- {images[i]}: {e}" for i, e in failures)
+        raise RuntimeError(
+            f"{len(failures)} of {len(images)} clips failed to render "
+            f"(finished clips kept in {temp_dir}):\n{details}"
+        )
     return clips
 
-def build_filter_chain(clips, per_image_duration):
+def build_zoompan_filter(per_image_duration, profile=None, simple=False):
+    """zoompan filter reproducing KenBurnsEffect on a looped still image.
+
+    Like create_ken_burns_smooth in video-clip-maker.py, but with Manim's
+    `smooth` easing on the zoom (1.2 -> 1.3) and the upward shift. The image
+    is first fitted to the frame height the way Manim's set_height does, at
+    ZOOMPAN_OVERSAMPLE times the output size so zoompan's whole-pixel crop
+    offsets don't make the slow pan judder. scale=-2 rounds the width, which
+    leaves a slightly non-square SAR that differs per image size; setsar=1
+    resets it so concat accepts stills of any aspect ratio.
+
+    With simple=True (previews) the motion is linear and zoompan works at
+    the output size, which is cheaper but may judder slightly.
+    """
+    profile = get_profile(profile)
+    oversample = 1 if simple else ZOOMPAN_OVERSAMPLE
+    width = profile.width * oversample
+    height = profile.height * oversample
+    total_frames = max(2, round(per_image_duration * profile.fps))
+    error = 1 / (1 + math.exp(5))
+    progress = f"min(1,on/{total_frames - 1})"
+    if simple:
+        alpha = progress
+    else:
+        alpha = f"((1/(1+exp(-10*({progress}-0.5)))-{error:.8f})/{1 - 2 * error:.8f})"
+    zoom_expr = f"{START_SCALE}+{END_SCALE - START_SCALE:.4f}*{alpha}"
+    # Manim shifts the image up by SHIFT_UP_UNITS on screen, so the crop
+    # window moves down by that amount in (zoomed) input pixels
+    shift = SHIFT_UP_UNITS / FRAME_HEIGHT_UNITS
+    x_expr = "iw/2-(iw/zoom)/2"
+    y_expr = f"ih/2-(ih/zoom)/2+ih*{shift:.6f}*{alpha}/zoom"
+    return (
+        f"scale=-2:{height},crop='min(iw,{width})':{height},pad={width}:{height}:(ow-iw)/2:0,setsar=1,"
+        f"zoompan=z='{zoom_expr}':x='{x_expr}':y='{y_expr}':"
+        f"d=1:s={profile.width}x{profile.height}:fps={profile.fps},setsar=1"
+    )
+
+def build_image_inputs(images, per_image_duration, fps=30):
+    """ffmpeg input arguments that feed each still image as a looped stream"""
+    return sum([["-loop", "1", "-framerate", str(fps), "-t", str(per_image_duration), "-i", img]
+                for img in images], [])
+
+def build_filter_chain(clips, per_image_duration, ken_burns=False, profile=None, simple_motion=False, start=0,
+                       total=None):
+    """Build the fade + concat filter graph over all inputs.
+
+    With ken_burns=True the inputs are still images (see build_image_inputs)
+    and each one gets the zoompan motion in the same graph, so the whole
+    video is produced in a single encode without intermediate clips.
+    The graph runs at the render profile's frame rate. For one chunk of a
+    longer timeline, `start` is the first clip's position in it and `total`
+    its length, so only the real first and last clips lose a fade.
+    """
+    profile = get_profile(profile)
     # Add fade in/out effects with concat filter
     filter_chain = ""
     filter_labels = []
     
-    fade_duration = 1.0  # 1.0 seconds for fade in/out (increased from 0.5)
+    fade_duration = get_fade_duration(per_image_duration)
+    motion = build_zoompan_filter(per_image_duration, profile, simple_motion) + "," if ken_burns else ""
+    fps = profile.fps
+    
+    if total is None:
+        total = len(clips)
     
     for i in range(len(clips)):
         # Add fade in for first clip, fade out for last clip, and both for middle clips
-        if i == 0:  # First clip - fade in only
-            filter_chain += f"[{i}:v]fps=30,setpts=PTS-STARTPTS,fade=t=in:st=0:d={fade_duration}[v{i}];"
-        elif i == len(clips) - 1:  # Last clip - fade out only
-            filter_chain += f"[{i}:v]fps=30,setpts=PTS-STARTPTS,fade=t=out:st={per_image_duration-fade_duration}:d={fade_duration}[v{i}];"
+        if start + i == 0:  # First clip - fade in only
+            filter_chain += f"[{i}:v]{motion}fps={fps},setpts=PTS-STARTPTS,fade=t=in:st=0:d={fade_duration}[v{i}];"
+        elif start + i == total - 1:  # Last clip - fade out only
+            filter_chain += f"[{i}:v]{motion}fps={fps},setpts=PTS-STARTPTS,fade=t=out:st={per_image_duration-fade_duration}:d={fade_duration}[v{i}];"
         else:  # Middle clips - fade in and out
-            filter_chain += f"[{i}:v]fps=30,setpts=PTS-STARTPTS,fade=t=in:st=0:d={fade_duration},fade=t=out:st={per_image_duration-fade_duration}:d={fade_duration}[v{i}];"
+            filter_chain += f"[{i}:v]{motion}fps={fps},setpts=PTS-STARTPTS,fade=t=in:st=0:d={fade_duration},fade=t=out:st={per_image_duration-fade_duration}:d={fade_duration}[v{i}];"
         
         filter_labels.append(f"[v{i}]")
     
@@ -82,44 +378,448 @@ def build_filter_chain(clips, per_image_duration):
     
     return filter_chain, "[outv]"
 
-def generate_final_video(clips, audio_path, ass_path, output_path, filter_complex, final_label):
+def encode_audio(audio_path, output_path):
+    """Encode the soundtrack to AAC once, for outputs that stream-copy it"""
+    instrument.run_command([
+        FFMPEG, "-y", "-loglevel", "error", "-i", audio_path, "-vn", "-c:a", "aac", output_path
+    ], "Audio encode")
+
+def generate_final_video(clips, audio_path, ass_path, output_path, filter_complex, final_label, input_args=None,
+                         profile=None, glitter=None, renditions=()):
+    """Burn in the subtitles and encode the video with the audio.
+
+    `renditions` is a list of (output path, RenderProfile) for smaller
+    copies made in the same run: the subtitled picture is split and each
+    copy gets its own scale and encoder settings, and the audio is encoded
+    once and stream-copied into every output. Returns the encode's stats,
+    such as the number of frames written.
+    """
+    profile = get_profile(profile)
     subtitle_filter = f"ass={ass_path}"
-    cmd = [
-        FFMPEG, "-y"
-    ] + sum([["-i", clip] for clip in clips], []) + [
-        "-i", audio_path,
-        "-filter_complex", filter_complex + f";{final_label}{subtitle_filter},format=yuv420p[v]",
-        "-map", "[v]",
-        "-map", f"{len(clips)}:a",
-        "-c:v", "libx264",
-        "-preset", "fast",
-        "-r", "30",
-        "-crf", "18",
-        "-shortest",
-        output_path
-    ]
-    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    if result.returncode != 0:
-        raise RuntimeError("Failed to generate final video")
+    if input_args is None:
+        input_args = sum([["-i", clip] for clip in clips], [])
+    extra_inputs = []
+    if glitter is not None:
+        # Sparkles go under the subtitles; the looped overlay comes after the audio input
+        overlay = prepare_overlay(glitter.path, profile.width, profile.height, profile.fps)
+        extra_inputs = overlay_input_args(overlay)
+        filter_complex += ";" + build_overlay_filter(final_label, len(clips) + 1, glitter.opacity)
+        final_label = "[glitter]"
+    # Whole frames per image can leave the timeline a frame short of the audio; cloning the
+    # last frame lets every output reach exactly total_frames
+    filter_complex += f";{final_label}tpad=stop_mode=clone:stop={profile.fps},{subtitle_filter},format={profile.pix_fmt}"
+    if renditions:
+        filter_complex += f",split={len(renditions) + 1}[v]" + "".join(f"[r{n}]" for n in range(len(renditions)))
+        for n, (_, rendition) in enumerate(renditions):
+            filter_complex += f";[r{n}]scale={rendition.width}:{rendition.height}:flags=lanczos[v{n}]"
+    else:
+        filter_complex += "[v]"
+    total_frames = round(get_audio_duration(audio_path) * profile.fps)
+    # Every output stops at the same frame; -shortest would cut each one at
+    # a different point against the stream-copied AAC packets
+    limits = ["-frames:v", str(total_frames), "-t", f"{total_frames / profile.fps:.6f}"]
+    with tempfile.TemporaryDirectory() as audio_dir:
+        audio_args = []
+        if renditions:
+            encoded_audio = os.path.join(audio_dir, "audio.m4a")
+            encode_audio(audio_path, encoded_audio)
+            audio_path = encoded_audio
+            audio_args = ["-c:a", "copy"]
+        cmd = [
+            FFMPEG, "-y"
+        ] + input_args + [
+            "-i", audio_path,
+        ] + extra_inputs + [
+            "-filter_complex", filter_complex,
+            "-map", "[v]",
+            "-map", f"{len(clips)}:a",
+        ] + encoder_args(profile) + audio_args + limits + [
+            output_path
+        ]
+        for n, (rendition_path, rendition) in enumerate(renditions):
+            cmd += ["-map", f"[v{n}]", "-map", f"{len(clips)}:a"] + encoder_args(rendition) + audio_args + limits + [
+                rendition_path
+            ]
+        return instrument.run_command(cmd, "Final video encode", total_frames, "Encoding")
+
+def encode_video(images, clips, per_image_duration, audio_path, ass_path, output_path, *,
+                 segment_dir=None, jobs=None, profile=None, glitter=None, renditions=()):
+    """Final encode: fades, concat, subtitles and audio.
+
+    With clips=None the Ken Burns motion is rendered from the still images
+    inside the same filter graph (single-pass mode). With a segment_dir the
+    timeline is encoded as per-image segments in parallel, re-encoding only
+    segments whose clip or overlapping subtitles changed since the last run.
+    `glitter` is an optional GlitterOverlay screen-blended under the subtitles.
+    `renditions` are extra (output path, RenderProfile) copies encoded in
+    the same run (see generate_final_video).
+    """
+    profile = get_profile(profile)
+    if segment_dir is not None:
+        if glitter is not None:
+            raise ValueError("The glitter overlay is not supported with segmented encoding")
+        if renditions:
+            raise ValueError("Renditions are not supported with segmented encoding")
+        print("Generating final video from segments...")
+        if clips is None:
+            encode_segmented(images, per_image_duration, audio_path, ass_path, output_path, segment_dir,
+                             get_fade_duration(per_image_duration), jobs, profile.fps, encoder_args(profile),
+                             image_inputs=True, motion=build_zoompan_filter(per_image_duration, profile) + ",")
+        else:
+            encode_segmented(clips, per_image_duration, audio_path, ass_path, output_path, segment_dir,
+                             get_fade_duration(per_image_duration), jobs, profile.fps, encoder_args(profile))
+        return
+
+    if clips is None:
+        print("Rendering Ken Burns motion, fades and subtitles in a single pass...")
+        encode_timeline(images, per_image_duration, audio_path, ass_path, output_path, profile, glitter,
+                        ken_burns=True, renditions=renditions)
+        return
+
+    print("Generating final video...")
+    encode_timeline(clips, per_image_duration, audio_path, ass_path, output_path, profile, glitter,
+                    renditions=renditions)
+
+def encode_timeline(sources, per_image_duration, audio_path, ass_path, output_path, profile=None, glitter=None,
+                    ken_burns=False, simple_motion=False, renditions=()):
+    """Fades, concat, subtitles and audio over clips (or, with ken_burns, still images).
+
+    Up to MAX_GRAPH_INPUTS sources go into one filter graph; longer
+    timelines are assembled in chunks (see encode_chunked).
+    """
+    profile = get_profile(profile)
+    if len(sources) > MAX_GRAPH_INPUTS:
+        encode_chunked(sources, per_image_duration, audio_path, ass_path, output_path, profile, glitter, ken_burns,
+                       simple_motion, renditions)
+        return
+    input_args = build_image_inputs(sources, per_image_duration, profile.fps) if ken_burns else None
+    filter_complex, final_label = build_filter_chain(sources, per_image_duration, ken_burns, profile, simple_motion)
+    generate_final_video(sources, audio_path, ass_path, output_path, filter_complex, final_label, input_args,
+                         profile, glitter, renditions)
+
+def encode_chunked(sources, per_image_duration, audio_path, ass_path, output_path, profile=None, glitter=None,
+                   ken_burns=False, simple_motion=False, renditions=()):
+    """Final encode for timelines longer than MAX_GRAPH_INPUTS clips or images.
+
+    One filter graph with an input per clip keeps every demuxer and decoder
+    open at once, so file handles and memory grow with the image count.
+    Instead, MAX_GRAPH_INPUTS sources at a time get their fades and concat
+    in their own ffmpeg run, one after another, writing raw frames into the
+    pipe the final encode reads. No process has more than MAX_GRAPH_INPUTS
+    inputs open, and the picture is still compressed only once.
+    """
+    profile = get_profile(profile)
+    chunk_starts = range(0, len(sources), MAX_GRAPH_INPUTS)
+
+    def write_chunks(fifo):
+        for n, start in enumerate(chunk_starts):
+            chunk = sources[start:start + MAX_GRAPH_INPUTS]
+            if ken_burns:
+                input_args = build_image_inputs(chunk, per_image_duration, profile.fps)
+            else:
+                input_args = sum([["-i", clip] for clip in chunk], [])
+            filter_complex, label = build_filter_chain(chunk, per_image_duration, ken_burns, profile, simple_motion,
+                                                       start, len(sources))
+            instrument.run_command([
+                FFMPEG, "-loglevel", "error",
+            ] + input_args + [
+                "-filter_complex", filter_complex,
+                "-map", label,
+                "-r", str(profile.fps),
+                "-f", "rawvideo",
+                "-pix_fmt", profile.pix_fmt,
+                "pipe:1"
+            ], f"Timeline chunk {n + 1}/{len(chunk_starts)}", stdout=fifo)
+
+    print(f"Assembling {len(sources)} clips in {len(chunk_starts)} chunks of up to {MAX_GRAPH_INPUTS}...")
+    encode_from_fifo(write_chunks, profile.pix_fmt, audio_path, ass_path, output_path, profile, glitter, renditions)
+
+def encode_from_fifo(write, pix_fmt, audio_path, ass_path, output_path, profile=None, glitter=None, renditions=()):
+    """Final encode whose only video input is raw frames that write(fifo) produces.
+
+    The frames go through a named pipe, so they are never stored. write()
+    runs in a thread; if it fails, the error is raised once ffmpeg is done.
+    """
+    profile = get_profile(profile)
+    errors = []
+
+    def write_frames():
+        try:
+            with open(fifo_path, 'wb') as fifo:
+                write(fifo)
+        except BrokenPipeError:
+            pass  # ffmpeg stopped reading; its own error is reported
+        except Exception as e:
+            errors.append(e)
+
+    with tempfile.TemporaryDirectory() as fifo_dir:
+        fifo_path = os.path.join(fifo_dir, "timeline.raw")
+        os.mkfifo(fifo_path)
+        writer = threading.Thread(target=write_frames, daemon=True)
+        writer.start()
+        input_args = [
+            "-f", "rawvideo", "-pix_fmt", pix_fmt,
+            "-s", f"{profile.width}x{profile.height}", "-r", str(profile.fps),
+            "-i", fifo_path,
+        ]
+        try:
+            stats = generate_final_video([fifo_path], audio_path, ass_path, output_path,
+                                         "[0:v]setpts=PTS-STARTPTS[outv]", "[outv]", input_args, profile, glitter,
+                                         renditions)
+        finally:
+            # ffmpeg has exited. If it never opened the pipe, the writer may be
+            # blocked in open(): opening and closing the read end releases it
+            # into a broken pipe
+            while writer.is_alive():
+                os.close(os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK))
+                writer.join(0.1)
+    # Rounding each image to whole frames can leave the timeline a few frames
+    # longer than the audio. ffmpeg stops reading once the audio ends, and the
+    # producer writing that surplus fails with a broken pipe, which is fine
+    # as long as the encode got every frame it needed.
+    if errors and stats.get("frames", 0) < round(get_audio_duration(audio_path) * profile.fps):
+        raise RuntimeError(f"Producing frames for the final encode failed: {errors[0]}") from errors[0]
 
-def generate_subtitles_only(folder_path):
+def encode_piped(images, per_image_duration, audio_path, ass_path, output_path, jobs=None, profile=None,
+                 glitter=None, renditions=()):
+    """Final encode fed by the NumPy renderer through a named pipe.
+
+    The whole timeline, fades included, is rendered as raw RGB frames that
+    ffmpeg reads as its only video input. No clip is encoded, written or
+    decoded again, and the picture goes through a single lossy encode.
+    """
+    profile = get_profile(profile)
+
+    def write_frames(fifo):
+        write_timeline(images, per_image_duration, fifo, profile.width, profile.height, profile.fps,
+                       get_fade_duration(per_image_duration), jobs)
+
+    print("Rendering Ken Burns frames straight into the final encode...")
+    encode_from_fifo(write_frames, "rgb24", audio_path, ass_path, output_path, profile, glitter, renditions)
+
+def needed_image_height(profile, single_pass=False):
+    """Largest source height the Ken Burns motion can use at this profile"""
+    if single_pass:
+        # zoompan works on a copy scaled to ZOOMPAN_OVERSAMPLE times the frame height
+        return profile.height * ZOOMPAN_OVERSAMPLE
+    # Manim and the NumPy renderer fit the image to the frame, then zoom to END_SCALE
+    return math.ceil(profile.height * END_SCALE)
+
+def render_video(images, per_image_duration, audio_path, ass_path, output_path, temp_dir, segment_dir=None,
+                 options=None):
+    """Turn images, audio and an ASS file into the final video.
+
+    `options` is a RenderOptions. With prep_images, every image is decoded,
+    EXIF-oriented and downscaled once (see image_prep.py) and the renders
+    read the prepared copies. `intermediate` is how clips reach the final
+    encode (see INTERMEDIATES). `queue` is an optional ClipQueue whose
+    workers render the clips. `renditions` names smaller copies from
+    render_profiles.RENDITIONS that the final encode also writes (see
+    get_rendition_path). With a segment_dir the timeline is encoded as
+    per-image segments kept there.
+    """
+    options = options or RenderOptions()
+    profile = get_profile(options.profile)
+    if options.intermediate == "pipe" and (options.single_pass or segment_dir is not None):
+        raise ValueError("The pipe intermediate can't be combined with single-pass or segmented encoding")
+    renditions = [(get_rendition_path(output_path, name), rendition_profile(profile, name))
+                  for name in options.renditions]
+    clips_profile = clip_profile(profile, options.backend, options.intermediate)
+    if options.prep_images:
+        with instrument.trace.stage("image prep"):
+            images = prepare_images(images, needed_image_height(profile, options.single_pass), options.jobs)
+    if options.intermediate == "pipe":
+        with instrument.trace.stage("final encode"):
+            encode_piped(images, per_image_duration, audio_path, ass_path, output_path, options.jobs, profile,
+                         options.glitter, renditions)
+        return
+    clips = None
+    if not options.single_pass:
+        print("Generating clips...")
+        with instrument.trace.stage("clips"):
+            clips = generate_clip_commands(images, per_image_duration, temp_dir, jobs=options.jobs,
+                                           cache=options.cache, backend=options.backend, profile=clips_profile,
+                                           queue=options.queue)
+    with instrument.trace.stage("final encode"):
+        encode_video(images, clips, per_image_duration, audio_path, ass_path, output_path, segment_dir=segment_dir,
+                     jobs=options.jobs, profile=profile, glitter=options.glitter, renditions=renditions)
+
+def render_pipelined(images, per_image_duration, audio_path, ass_path, output_path, temp_dir, segment_dir,
+                     options=None, transcribe=False, asr_workers=1):
+    """Overlap transcription, clip rendering and the final encode.
+
+    Transcription (when `transcribe` is set) and clip rendering run at the
+    same time. Once subtitles.ass exists, each clip's segment is encoded as
+    soon as the clip arrives, in whatever order they finish, and the
+    segments are joined with a stream-copy concat at the end. The run then
+    takes roughly as long as the slower of transcription and clip rendering
+    plus one segment encode, instead of the sum of all stages. `options`
+    is a RenderOptions.
+    """
+    options = options or RenderOptions()
+    profile = get_profile(options.profile)
+    single_pass = options.single_pass
+    if options.intermediate == "pipe":
+        raise ValueError("The pipe intermediate can't be combined with pipelined (segmented) encoding")
+    clips_profile = clip_profile(profile, options.backend, options.intermediate)
+    jobs = options.jobs
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if options.prep_images:
+        with instrument.trace.stage("image prep"):
+            images = prepare_images(images, needed_image_height(profile, single_pass), jobs)
+
+    lock = threading.Lock()
+    arrived = []  # clips that finished before the subtitles were ready
+    encodes = []
+    encoder = None
+
+    with ThreadPoolExecutor(max_workers=2) as stages, ThreadPoolExecutor(max_workers=jobs) as encode_pool:
+        def on_clip(i, clip):
+            with lock:
+                if encoder is None:
+                    arrived.append((i, clip))
+                else:
+                    encodes.append(encode_pool.submit(encoder.encode, i, clip))
+
+        def render_clips():
+            if single_pass:
+                # Segments render the motion straight from the still images
+                for i, img in enumerate(images):
+                    on_clip(i, img)
+                return
+            with instrument.trace.stage("clips"):
+                generate_clip_commands(images, per_image_duration, temp_dir, jobs=jobs, cache=options.cache,
+                                       backend=options.backend, profile=clips_profile, on_clip=on_clip,
+                                       queue=options.queue)
+
+        clip_stage = stages.submit(render_clips)
+        if transcribe:
+            stages.submit(transcribe_subtitles, audio_path, ass_path, asr_workers).result()
+
+        print("Encoding segments as clips arrive...")
+        motion = build_zoompan_filter(per_image_duration, profile) + "," if single_pass else ""
+        with lock:
+            encoder = SegmentedEncoder(len(images), per_image_duration, ass_path, segment_dir,
+                                       get_fade_duration(per_image_duration), profile.fps, encoder_args(profile),
+                                       single_pass, motion)
+            encodes.extend(encode_pool.submit(encoder.encode, i, clip) for i, clip in arrived)
+        clip_stage.result()
+
+        errors = []
+        with instrument.trace.stage("segments"):
+            for future in encodes:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(str(e))
+    print(f"  {encoder.reused} of {len(images)} segments unchanged")
+    with instrument.trace.stage("join"):
+        encoder.finish(audio_path, output_path, errors)
+
+def get_preview_path(folder_path):
+    """Preview video path: <folder>/<folder name>_preview.mp4, never used as a render input"""
+    output_filename = os.path.basename(os.path.normpath(folder_path)) + "_preview.mp4"
+    return os.path.join(folder_path, output_filename)
+
+def find_images(folder_path):
+    """Image files of a project folder, in the order they appear in the video"""
+    return sorted([os.path.join(folder_path, f) for f in os.listdir(folder_path)
+                   if f.lower().endswith((".png", ".jpg", ".jpeg"))])
+
+def get_output_path(folder_path):
+    """Final video path: <folder>/<folder name>.mp4"""
+    output_filename = os.path.basename(os.path.normpath(folder_path)) + ".mp4"
+    return os.path.join(folder_path, output_filename)
+
+def get_rendition_path(output_path, name):
+    """Where a rendition goes: <folder>/<name>.mp4 -> <folder>/<name>_720p.mp4"""
+    return f"{os.path.splitext(output_path)[0]}_{name}.mp4"
+
+def get_temp_dir(folder_path, temp_root=None):
+    """Scratch directory for intermediate clips.
+
+    <folder>/temp_clips by default. With temp_root (e.g. the RAM-backed
+    /dev/shm) the clips get a private directory there instead, so writing
+    and re-reading them never touches the project's disk.
+    """
+    if temp_root is None:
+        return os.path.join(folder_path, "temp_clips")
+    os.makedirs(temp_root, exist_ok=True)
+    name = os.path.basename(os.path.normpath(folder_path))
+    return tempfile.mkdtemp(prefix=f"{name}_clips_", dir=temp_root)
+
+def transcribe_subtitles(audio_path, ass_path, asr_workers=1):
+    # The MP3 is decoded straight into the recognizer, no WAV is written
+    print("Generating subtitles...")
+    with instrument.trace.stage("transcription"):
+        generate_ass_subtitles(audio_path, ass_path, workers=asr_workers)
+
+def subtitles_fingerprint(graph, audio_path):
+    """Build graph inputs of the audio -> word timings -> ASS/TXT step"""
+    return graph.fingerprint([audio_path], model=os.path.abspath(DEFAULT_MODEL_PATH), max_words=4)
+
+def needs_transcription(graph, fingerprint, ass_path, txt_path):
+    """Whether full mode should transcribe audio.mp3 into subtitles.ass/.txt.
+
+    Subtitles made before the project had a build manifest are adopted as
+    they are. Subtitles edited since they were generated are never
+    overwritten; --force re-transcribes anyway.
+    """
+    outputs = [ass_path, txt_path]
+    if graph.is_current("subtitles", fingerprint, outputs):
+        print("⏭️  subtitles: up to date")
+        return False
+    if graph.force or not all(os.path.exists(path) for path in outputs):
+        return True
+    if "subtitles" not in graph.manifest["steps"]:
+        print("📌 subtitles: keeping the existing subtitles.ass/subtitles.txt")
+        graph.record("subtitles", fingerprint, outputs)
+        return False
+    edited = graph.edited_outputs("subtitles", outputs)
+    if edited:
+        raise ValueError(f"audio.mp3 changed, but the subtitles were edited after they were generated "
+                         f"({', '.join(edited)}). Move them away or pass --force to transcribe again.")
+    return True
+
+def video_fingerprint(graph, images, audio_path, ass_path, options):
+    """Build graph inputs of the images -> clips and clips + ASS + audio -> MP4 steps.
+
+    Clips live in temp_clips only for one run; the ClipCache makes the clip
+    part incremental per image, so the graph tracks them through the images
+    and the RenderOptions that change the output.
+    """
+    template_path = pathlib.Path(__file__).parent / CLIP_BACKENDS[options.backend][1]
+    files = images + [audio_path, ass_path, str(template_path)]
+    glitter = options.glitter
+    if glitter is not None:
+        files.append(glitter.path)
+    return graph.fingerprint(
+        files,
+        backend=options.backend,
+        single_pass=options.single_pass,
+        segmented=options.segmented,
+        profile=get_profile(options.profile)._asdict(),
+        glitter_opacity=glitter.opacity if glitter is not None else None,
+        prep_images=options.prep_images,
+        intermediate=options.intermediate,
+        renditions=list(options.renditions),
+    )
+
+def generate_subtitles_only(folder_path, asr_workers=1):
     """Generate subtitles only without creating video"""
     audio_path = os.path.join(folder_path, "audio.mp3")
-    wav_path = os.path.join(folder_path, "audio.wav")
     ass_path = os.path.join(folder_path, "subtitles.ass")
+    txt_path = ass_path.replace('.ass', '.txt')
     
     if not os.path.exists(audio_path):
         raise ValueError(f"Audio file not found: {audio_path}")
 
-    # Convert mp3 to wav for Vosk
-    if not os.path.exists(wav_path):
-        print("Converting MP3 to WAV for speech recognition...")
-        subprocess.run([FFMPEG, "-y", "-i", audio_path, wav_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-    print("Generating subtitles...")
-    generate_ass_subtitles(wav_path, ass_path)
+    # Always transcribe when asked to, but record it so a later full run can skip it
+    graph = BuildGraph(folder_path, force=True)
+    graph.step("subtitles", subtitles_fingerprint(graph, audio_path), [ass_path, txt_path],
+               transcribe_subtitles, audio_path, ass_path, asr_workers)
     
-    txt_path = ass_path.replace('.ass', '.txt')
     print(f"✅ Subtitles generated:")
     print(f"   ASS file: {ass_path}")
     print(f"   Text file: {txt_path}")
@@ -140,16 +840,32 @@ def regenerate_subtitles_from_edited_txt(folder_path):
     print(f"✅ ASS file updated: {ass_path}")
     print(f"🎬 You can now create video with: python make_video.py {folder_path} --mode video")
 
-def create_video_only(folder_path):
-    """Create video using existing subtitles"""
+def rechunk_subtitles(folder_path, max_words=4, pause=PAUSE_SECONDS):
+    """Rebuild the ASS and text files from the saved word timings with new chunking settings"""
+    audio_path = os.path.join(folder_path, "audio.mp3")
+    ass_path = os.path.join(folder_path, "subtitles.ass")
+
+    if not os.path.exists(audio_path):
+        raise ValueError(f"Audio file not found: {audio_path}")
+
+    # The sidecar is only written by transcription; a missing one never triggers it on its own
+    if not os.path.exists(get_words_path(ass_path)):
+        raise ValueError(f"Word timings not found: {get_words_path(ass_path)}. They are saved when subtitles "
+                         f"are transcribed (--mode subs, which replaces subtitles.ass and subtitles.txt)")
+    # Word timings are checked against audio.mp3, so stale timings are never re-chunked
+    print(f"🔄 Re-chunking subtitles: up to {max_words} words, new phrase after {pause:.2f}s pauses...")
+    rechunk_ass_from_words(ass_path, max_words, pause, audio_path)
+    print(f"✏️  This replaces edits made to the text file; re-apply them and run --mode regenerate-subs")
+    print(f"🎬 You can now create video with: python make_video.py {folder_path} --mode video")
+
+def create_video_only(folder_path, options=None):
+    """Create video using existing subtitles, unless the video is already up to date"""
+    options = options or RenderOptions()
     # Validate input files
-    images = sorted([os.path.join(folder_path, f) for f in os.listdir(folder_path)
-                     if f.lower().endswith((".png", ".jpg", ".jpeg"))])
+    images = find_images(folder_path)
     audio_path = os.path.join(folder_path, "audio.mp3")
     ass_path = os.path.join(folder_path, "subtitles.ass")
-    output_filename = os.path.basename(os.path.normpath(folder_path)) + ".mp4"
-    output_path = os.path.join(folder_path, output_filename)
-    temp_dir = os.path.join(folder_path, "temp_clips")
+    output_path = get_output_path(folder_path)
 
     if not images:
         raise ValueError(f"No image files found in {folder_path}")
@@ -159,6 +875,7 @@ def create_video_only(folder_path):
         raise ValueError(f"Subtitle file not found: {ass_path}. Run with --mode subs first.")
 
     # Create temp directory
+    temp_dir = get_temp_dir(folder_path, options.temp_root)
     os.makedirs(temp_dir, exist_ok=True)
 
     try:
@@ -167,17 +884,18 @@ def create_video_only(folder_path):
 
         print(f"Processing {len(images)} images with {per_image_duration:.2f}s per image...")
         print("Using existing subtitles...")
-        wav_path = os.path.join(folder_path, "audio.wav")
-        print("Generating clips...")
-        clips = generate_clip_commands(images, per_image_duration, temp_dir)
-        filter_complex, final_label = build_filter_chain(clips, per_image_duration)
-        
-        print("Generating final video...")
-        generate_final_video(clips, audio_path, ass_path, output_path, filter_complex, final_label)
-
-        print(f"✅ Video created at: {output_path}")
+        segment_dir = os.path.join(folder_path, "segments") if options.segmented else None
+        graph = BuildGraph(folder_path, options.force)
+        fingerprint = video_fingerprint(graph, images, audio_path, ass_path, options)
+        outputs = [output_path] + [get_rendition_path(output_path, name) for name in options.renditions]
+        if graph.step("video", fingerprint, outputs, render_video, images, per_image_duration, audio_path,
+                      ass_path, output_path, temp_dir, segment_dir, options):
+            print(f"✅ Video created at: {output_path}")
+        else:
+            print(f"✅ Video is up to date: {output_path}")
+        for rendition_path in outputs[1:]:
+            print(f"   Rendition: {rendition_path}")
         shutil.rmtree(temp_dir)
-        os.remove(wav_path)
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -185,75 +903,212 @@ def create_video_only(folder_path):
     finally:
         print("🧹 Cleaned up temporary files")
 
-def main(folder_path, mode="full"):
+def create_video_pipelined(folder_path, images, options=None, asr_workers=1):
+    """Full mode with transcription, clip rendering and segment encoding overlapped"""
+    # Pipelined output is always segmented
+    options = (options or RenderOptions())._replace(segmented=True)
+    if options.glitter is not None:
+        raise ValueError("The glitter overlay is not supported with pipelined (segmented) encoding")
+    audio_path = os.path.join(folder_path, "audio.mp3")
+    ass_path = os.path.join(folder_path, "subtitles.ass")
+    txt_path = os.path.join(folder_path, "subtitles.txt")
+    output_path = get_output_path(folder_path)
+    segment_dir = os.path.join(folder_path, "segments")
+
+    graph = BuildGraph(folder_path, options.force)
+    subs_fingerprint = subtitles_fingerprint(graph, audio_path)
+    transcribe = needs_transcription(graph, subs_fingerprint, ass_path, txt_path)
+    if not transcribe:
+        fingerprint = video_fingerprint(graph, images, audio_path, ass_path, options)
+        if graph.is_current("video", fingerprint, [output_path]):
+            print(f"✅ Video is up to date: {output_path}")
+            return
+
+    temp_dir = get_temp_dir(folder_path, options.temp_root)
+    os.makedirs(temp_dir, exist_ok=True)
+    per_image_duration = get_audio_duration(audio_path) / len(images)
+    print(f"Processing {len(images)} images with {per_image_duration:.2f}s per image...")
+    render_pipelined(images, per_image_duration, audio_path, ass_path, output_path, temp_dir, segment_dir, options,
+                     transcribe=transcribe, asr_workers=asr_workers)
+    if transcribe:
+        graph.record("subtitles", subs_fingerprint, [ass_path, txt_path])
+    # The video's fingerprint covers the ASS, which only exists now
+    graph.record("video", video_fingerprint(graph, images, audio_path, ass_path, options))
+    shutil.rmtree(temp_dir)
+    print(f"✅ Video created at: {output_path}")
+
+def create_preview(folder_path, profile=None, prep_images=True):
+    """Quick low-resolution render with the current subtitles, for reviewing subtitle timing.
+
+    Renders straight from the still images in one ffmpeg pass with linear
+    motion and a fast encoder. Nothing is written to the clip cache, segments
+    or temp_clips, so the preview never feeds into the final render.
+    """
+    images = find_images(folder_path)
+    audio_path = os.path.join(folder_path, "audio.mp3")
+    ass_path = os.path.join(folder_path, "subtitles.ass")
+    output_path = get_preview_path(folder_path)
+
+    if not images:
+        raise ValueError(f"No image files found in {folder_path}")
+    if not os.path.exists(audio_path):
+        raise ValueError(f"Audio file not found: {audio_path}")
+    if not os.path.exists(ass_path):
+        raise ValueError(f"Subtitle file not found: {ass_path}. Run with --mode subs first.")
+
+    preview = preview_profile(get_profile(profile))
+    per_image_duration = get_audio_duration(audio_path) / len(images)
+    if prep_images:
+        # Simple motion zooms at output size, so preview-sized images are enough
+        images = prepare_images(images, math.ceil(preview.height * END_SCALE))
+    print(f"👀 Rendering {preview.width}x{preview.height} preview at {preview.fps} fps...")
+    with instrument.trace.stage("preview"):
+        encode_timeline(images, per_image_duration, audio_path, ass_path, output_path, preview, ken_burns=True,
+                        simple_motion=True)
+    print(f"✅ Preview created at: {output_path}")
+    print(f"🎬 When the subtitles look right, run: python make_video.py {folder_path} --mode video")
+
+def main(folder_path, mode="full", options=None, asr_workers=1, pipeline=False, max_words=4, pause=PAUSE_SECONDS):
     """
     Main function with different modes:
-    - 'full': Generate subtitles and create video (original behavior)
+    - 'full': Generate subtitles and create video, rebuilding only what changed
     - 'subs': Generate subtitles only
     - 'video': Create video using existing subtitles
     - 'regenerate-subs': Regenerate ASS file from edited text file
+    - 'rechunk-subs': Rebuild the subtitles from the saved word timings with
+      `max_words` per phrase and a new phrase after `pause` seconds of silence
+    - 'preview': Quick low-resolution video with the current subtitles
+
+    `options` is a RenderOptions with the render settings:
+    `jobs` caps how many clips render concurrently (defaults to the CPU count).
+    `cache` is an optional ClipCache used to reuse previously rendered clips.
+    `backend` picks the clip renderer: 'manim' or the in-process 'numpy' one.
+    `single_pass` skips intermediate clips and renders everything in one encode.
+    `segmented` encodes per-image segments in parallel and keeps them in
+    <folder>/segments so later runs only re-encode what changed.
+    `profile` is a render profile name from render_profiles.PROFILES.
+    `glitter` is an optional GlitterOverlay blended over the video.
+    `prep_images` renders from decoded, oriented and downscaled image copies.
+    `force` rebuilds every step even if the build manifest says it is current.
+    `intermediate` is how clips reach the final encode: 'h264', 'lossless'
+    or 'pipe' (see INTERMEDIATES; the last two need the numpy backend).
+    `temp_root` puts the intermediate clips under another directory, such as
+    the RAM-backed /dev/shm, instead of <folder>/temp_clips.
+    `queue` is an optional ClipQueue; its workers render the clips instead of
+    this machine.
+    `renditions` names smaller copies (render_profiles.RENDITIONS, or e.g.
+    '540p') encoded from the same filter graph as the main video.
+
+    `asr_workers` recognizes silence-separated audio segments in parallel.
+    `pipeline` (full mode) overlaps transcription with clip rendering and
+    encodes segments as clips arrive; it implies segmented output.
     """
+    options = options or RenderOptions()
     if mode == "subs":
-        generate_subtitles_only(folder_path)
+        generate_subtitles_only(folder_path, asr_workers)
     elif mode == "video":
-        create_video_only(folder_path)
+        create_video_only(folder_path, options)
     elif mode == "regenerate-subs":
         regenerate_subtitles_from_edited_txt(folder_path)
-    else:  # full mode - original behavior
+    elif mode == "rechunk-subs":
+        rechunk_subtitles(folder_path, max_words, pause)
+    elif mode == "preview":
+        create_preview(folder_path, options.profile, options.prep_images)
+    else:  # full mode - subtitles then video, each rebuilt only if its inputs changed
         # Validate input files
-        images = sorted([os.path.join(folder_path, f) for f in os.listdir(folder_path)
-                         if f.lower().endswith((".png", ".jpg", ".jpeg"))])
+        images = find_images(folder_path)
         audio_path = os.path.join(folder_path, "audio.mp3")
-        wav_path = os.path.join(folder_path, "audio.wav")
-        output_filename = os.path.basename(os.path.normpath(folder_path)) + ".mp4"
-        output_path = os.path.join(folder_path, output_filename)
-        temp_dir = os.path.join(folder_path, "temp_clips")
-        ass_path = os.path.join(temp_dir, "subtitles.ass")
+        ass_path = os.path.join(folder_path, "subtitles.ass")
+        txt_path = os.path.join(folder_path, "subtitles.txt")
 
         if not images:
             raise ValueError(f"No image files found in {folder_path}")
         if not os.path.exists(audio_path):
             raise ValueError(f"Audio file not found: {audio_path}")
 
-        # Convert mp3 to wav for Vosk
-        if not os.path.exists(wav_path):
-            subprocess.run([FFMPEG, "-y", "-i", audio_path, wav_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-        # Create temp directory
-        os.makedirs(temp_dir, exist_ok=True)
+        if pipeline:
+            if options.renditions:
+                raise ValueError("Renditions are not supported with pipelined (segmented) encoding")
+            create_video_pipelined(folder_path, images, options, asr_workers)
+            return
 
-        try:
-            duration = get_audio_duration(audio_path)
-            per_image_duration = duration / len(images)
-
-            print(f"Processing {len(images)} images with {per_image_duration:.2f}s per image...")
-            
-            # Generate .ass subtitles with word-level highlighting
-            print("Generating subtitles...")
-            generate_ass_subtitles(wav_path, ass_path)
-
-            print("Generating clips...")
-            clips = generate_clip_commands(images, per_image_duration, temp_dir)
-            filter_complex, final_label = build_filter_chain(clips, per_image_duration)
-            
-            print("Generating final video...")
-            generate_final_video(clips, audio_path, ass_path, output_path, filter_complex, final_label)
-
-            print(f"✅ Video created at: {output_path}")
-            os.remove(wav_path)
-            shutil.rmtree(temp_dir)
-            
-        except Exception as e:
-            print(f"❌ Error: {e}")
-            raise
-        finally:
-            print("🧹 Cleaned up temporary files")
+        # Subtitles edited with regenerate-subs are kept until audio.mp3 changes
+        graph = BuildGraph(folder_path, options.force)
+        subs_fingerprint = subtitles_fingerprint(graph, audio_path)
+        if needs_transcription(graph, subs_fingerprint, ass_path, txt_path):
+            graph.step("subtitles", subs_fingerprint, [ass_path, txt_path],
+                       transcribe_subtitles, audio_path, ass_path, asr_workers)
+        create_video_only(folder_path, options)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Create video with Ken Burns effect and subtitles")
     parser.add_argument("folder", help="Folder containing images, audio.mp3, and optionally subtitles.ass")
-    parser.add_argument("--mode", choices=["full", "subs", "video", "regenerate-subs"], default="full",
-                       help="Mode: 'full' (generate subs + video), 'subs' (generate subs only), 'video' (use existing subs), 'regenerate-subs' (regenerate ASS from edited text)")
+    parser.add_argument("--mode", choices=["full", "subs", "video", "regenerate-subs", "rechunk-subs", "preview"], default="full",
+                       help="Mode: 'full' (generate subs + video), 'subs' (generate subs only), 'video' (use existing subs), 'regenerate-subs' (regenerate ASS from edited text), 'rechunk-subs' (rebuild subs from saved word timings without recognition), 'preview' (fast low-resolution video with existing subs)")
+    parser.add_argument("--max-words", type=int, default=4,
+                       help="Rechunk-subs mode: maximum words per subtitle phrase")
+    parser.add_argument("--pause", type=float, default=PAUSE_SECONDS,
+                       help="Rechunk-subs mode: start a new phrase after a gap between words longer than this many seconds")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                       help="Number of clips to render in parallel (default: number of CPU cores)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                       help=f"Directory for the rendered clip cache, shareable across projects (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 3,
+                       help="Maximum clip cache size in GB before least recently used clips are evicted")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-render clips and don't touch the clip cache")
+    parser.add_argument("--backend", choices=sorted(CLIP_BACKENDS), default="manim",
+                       help="Clip renderer: 'manim' (one Manim process per image), 'manim-batch' (one Manim process per --jobs shard) or 'numpy' (experimental: in-process, streams frames to ffmpeg)")
+    parser.add_argument("--single-pass", action="store_true",
+                       help="Skip intermediate clips: apply Ken Burns zoompan, fades and subtitles in one ffmpeg encode")
+    parser.add_argument("--asr-workers", type=int, default=1,
+                       help="Speech recognition processes; audio is split at silences (each worker loads the Vosk model)")
+    parser.add_argument("--segmented", action="store_true",
+                       help="Encode per-image segments in parallel and only re-encode segments whose clip or subtitles changed")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                       help="Output size, frame rate and encoder settings; clips are rendered to match")
+    parser.add_argument("--rendition", action="append", default=[],
+                       help=f"Also write a smaller copy from the same encode, e.g. <name>_720p.mp4; repeatable ({', '.join(RENDITIONS)}, or any <short side>p such as 540p)")
+    parser.add_argument("--glitter", help="Sparkle video (e.g. glitter_8x.mp4) to loop and screen-blend over the video")
+    parser.add_argument("--glitter-opacity", type=float, default=DEFAULT_OPACITY, help="Strength of the glitter overlay (0-1)")
+    parser.add_argument("--no-image-prep", action="store_true",
+                       help="Render from the original images instead of cached, oriented and downscaled copies")
+    parser.add_argument("--pipeline", action="store_true",
+                       help="Full mode: transcribe while clips render and encode segments as clips arrive (implies --segmented)")
+    parser.add_argument("--intermediate", choices=INTERMEDIATES, default="h264",
+                       help="How clips reach the final encode: 'h264' files, 'lossless' H.264 files, or 'pipe' raw frames through a named pipe (the last two need --backend numpy)")
+    parser.add_argument("--temp-dir", help="Put intermediate clips under this directory instead of <folder>/temp_clips, e.g. the RAM-backed /dev/shm")
+    parser.add_argument("--queue", help="Render clips with workers on other machines: queue them in this directory on shared storage (see clip_queue.py)")
+    parser.add_argument("--queue-workers", type=int, default=0,
+                       help="Also start this many clip_queue.py workers on this machine for the queued clips")
+    parser.add_argument("--queue-lease", type=float, default=LEASE_SECONDS,
+                       help="Seconds without a worker heartbeat before its clip is handed to another worker")
+    parser.add_argument("--force", action="store_true",
+                       help="Rebuild subtitles and video even if the build manifest says they are up to date")
+    parser.add_argument("--trace", help="Write per-stage, per-clip and per-process timings and resource usage to this JSON file")
+    parser.add_argument("--no-progress", action="store_true", help="Don't show progress bars")
     
     args = parser.parse_args()
-    main(args.folder, args.mode)
+    cache = None if args.no_cache else ClipCache(args.cache_dir, int(args.cache_size * 1024 ** 3))
+    glitter = GlitterOverlay(args.glitter, args.glitter_opacity) if args.glitter else None
+    queue = ClipQueue(args.queue, args.queue_lease, local_workers=args.queue_workers) if args.queue else None
+    instrument.start_trace(args.trace, not args.no_progress)
+    try:
+        options = RenderOptions(
+            jobs=args.jobs,
+            cache=cache,
+            backend=args.backend,
+            single_pass=args.single_pass,
+            segmented=args.segmented,
+            profile=args.profile,
+            glitter=glitter,
+            prep_images=not args.no_image_prep,
+            force=args.force,
+            intermediate=args.intermediate,
+            temp_root=args.temp_dir,
+            queue=queue,
+            renditions=tuple(args.rendition),
+        )
+        main(args.folder, args.mode, options, asr_workers=args.asr_workers, pipeline=args.pipeline,
+             max_words=args.max_words, pause=args.pause)
+    finally:
+        instrument.trace.save()
@@ -0,0 +1,75 @@
+# Render many Ken Burns clips in one Manim process, with the Manim env's python:
+#
+#     env/bin/python manim_batch.py jobs.json results.json
+#
+# jobs.json holds the ken_burns.py template, the render profile and one job
+# per clip (index, image, run_time, output, work_dir). Manim is imported once
+# and each clip is written straight to its output path. results.json maps
+# each index to null or an error message.
+import json
+import os
+import shutil
+import sys
+import time
+import traceback
+
+def scene_source(template, job, profile):
+    return template.replace(
+        "{{IMAGE_PATH}}", job["image"]
+    ).replace(
+        "{{RUN_TIME}}", str(job["run_time"])
+    ).replace(
+        "{{PIXEL_WIDTH}}", str(profile["width"])
+    ).replace(
+        "{{PIXEL_HEIGHT}}", str(profile["height"])
+    ).replace(
+        "{{FPS}}", str(profile["fps"])
+    )
+
+def render_job(job, template, profile):
+    from manim import tempconfig
+
+    output_dir, output_name = os.path.split(job["output"])
+    settings = {
+        # Scratch files (partial movies, images) stay in the job's own dir;
+        # the finished clip goes straight to its output path
+        "media_dir": job["work_dir"],
+        "partial_movie_dir": os.path.join(job["work_dir"], "partial_movie_files"),
+        "video_dir": output_dir,
+        "output_file": output_name,
+        "write_to_movie": True,
+        "disable_caching": True,
+        "progress_bar": "none",
+        "verbosity": "WARNING",
+    }
+    # The template sets pixel size and frame rate on the global config, so
+    # run it inside tempconfig to undo that before the next clip
+    try:
+        with tempconfig(settings):
+            namespace = {"__name__": f"scene_{job['index']}"}
+            exec(compile(scene_source(template, job, profile), f"scene_{job['index']}.py", "exec"), namespace)
+            namespace["KenBurnsEffect"]().render()
+    finally:
+        shutil.rmtree(job["work_dir"], ignore_errors=True)
+
+def main(jobs_path, results_path):
+    with open(jobs_path, 'r', encoding='utf-8') as f:
+        batch = json.load(f)
+
+    start = time.perf_counter()
+    import manim  # noqa: F401 - pay the import once for the whole batch
+    print(f"Manim loaded in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    results = {}
+    for job in batch["jobs"]:
+        try:
+            render_job(job, batch["template"], batch["profile"])
+            results[job["index"]] = None
+        except Exception:
+            results[job["index"]] = "\n".join(traceback.format_exc().strip().splitlines()[-10:])
+
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f)
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,273 @@
+import math
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from instrument import read_stderr_tail, wait_process
+
+FFMPEG = "/opt/homebrew/bin/ffmpeg"
+
+# Motion of KenBurnsEffect in ken_burns.py, expressed in Manim units
+FRAME_HEIGHT_UNITS = 14.4
+START_SCALE = 1.2
+END_SCALE = 1.3
+SHIFT_UP_UNITS = 1.2
+
+def smooth(t, inflection=10.0):
+    """Vectorized copy of manim.utils.rate_functions.smooth"""
+    error = 1 / (1 + np.exp(inflection / 2))
+    value = (1 / (1 + np.exp(-inflection * (t - 0.5))) - error) / (1 - 2 * error)
+    return np.clip(value, 0, 1)
+
+def load_image(image_path, height):
+    """Decode an image once, shrinking it to the largest size the zoom shows"""
+    img = Image.open(image_path)
+    max_height = math.ceil(height * END_SCALE)
+    if img.height > max_height:
+        # Let the JPEG decoder skip detail we would throw away anyway
+        img.draft("RGB", (img.width * max_height // img.height, max_height))
+    img = img.convert("RGB")
+    if img.height > max_height:
+        new_width = max(1, round(img.width * max_height / img.height))
+        img = img.resize((new_width, max_height), Image.LANCZOS)
+    return np.asarray(img, dtype=np.float32)
+
+def _axis_taps(coords, size):
+    """Bilinear sample indices, weights and coverage mask along one axis"""
+    base = np.floor(coords)
+    frac = (coords - base).astype(np.float32)
+    base = base.astype(np.intp)
+    lo = np.clip(base, 0, size - 1)
+    hi = np.clip(base + 1, 0, size - 1)
+    # Samples outside the image show Manim's black background
+    inside = (coords >= -0.5) & (coords <= size - 0.5)
+    return lo, hi, frac, inside
+
+def render_frame(src, alpha, width, height, gain=1.0):
+    """Resample the source image for one point along the Ken Burns path.
+
+    alpha is the eased progress in [0, 1]. The image fills the frame height at
+    scale 1.0, is centered, then scaled and shifted upwards exactly like the
+    Manim scene. `gain` scales the brightness (fades). Returns an
+    (height, width, 3) uint8 frame.
+    """
+    src_height, src_width = src.shape[:2]
+    px_per_unit = height / FRAME_HEIGHT_UNITS
+    scale = START_SCALE + (END_SCALE - START_SCALE) * alpha
+    # Output pixels per source pixel
+    zoom = scale * height / src_height
+    center_x = width / 2
+    center_y = height / 2 - alpha * SHIFT_UP_UNITS * px_per_unit
+
+    xs = (np.arange(width) + 0.5 - center_x) / zoom + src_width / 2 - 0.5
+    ys = (np.arange(height) + 0.5 - center_y) / zoom + src_height / 2 - 0.5
+    x_lo, x_hi, x_frac, x_inside = _axis_taps(xs, src_width)
+    y_lo, y_hi, y_frac, y_inside = _axis_taps(ys, src_height)
+
+    # Work on (rows, columns * channels) views so every weight broadcasts
+    # along the contiguous axis, and only touch the columns this frame needs
+    first_col = x_lo.min()
+    last_col = x_hi.max()
+    cols = src.reshape(src_height, src_width * 3)[:, first_col * 3:(last_col + 1) * 3]
+    channels = np.arange(3)
+    x_lo = ((x_lo - first_col)[:, None] * 3 + channels).ravel()
+    x_hi = ((x_hi - first_col)[:, None] * 3 + channels).ravel()
+    x_frac = np.repeat(x_frac, 3)[None, :]
+    y_frac = y_frac[:, None]
+
+    # np.take is much faster than fancy indexing for these row/column gathers
+    rows = np.take(cols, y_lo, axis=0)
+    rows *= 1 - y_frac
+    rows += np.take(cols, y_hi, axis=0) * y_frac
+    frame = np.take(rows, x_lo, axis=1)
+    frame *= 1 - x_frac
+    frame += np.take(rows, x_hi, axis=1) * x_frac
+    if not (x_inside.all() and y_inside.all()):
+        frame *= (y_inside[:, None] & np.repeat(x_inside, 3)[None, :])
+    if gain != 1.0:
+        frame *= gain
+    frame += 0.5
+    return frame.astype(np.uint8).reshape(height, width, 3)
+
+def clip_alphas(duration, fps):
+    """Eased Ken Burns progress for every frame of a clip"""
+    frame_count = max(1, round(duration * fps))
+    progress = np.linspace(0, 1, frame_count) if frame_count > 1 else np.ones(1)
+    return smooth(progress)
+
+def fade_gains(frame_count, fps, duration, fade_duration, fade_in, fade_out):
+    """Per-frame brightness of ffmpeg's fade=t=in:st=0 and fade=t=out:st=duration-fade_duration"""
+    t = np.arange(frame_count) / fps
+    gains = np.ones(frame_count)
+    if fade_in:
+        gains = np.minimum(gains, t / fade_duration)
+    if fade_out:
+        gains = np.minimum(gains, 1 - (t - (duration - fade_duration)) / fade_duration)
+    return np.clip(gains, 0, 1)
+
+def write_timeline(images, duration, output, width=1080, height=1920, fps=30, fade_duration=1.0, jobs=None):
+    """Write the whole faded Ken Burns timeline as raw RGB frames to a binary file object.
+
+    This is the same picture as rendering clips and joining them with the fade
+    and concat filters of make_video.build_filter_chain, but nothing is
+    encoded: the frames can go straight into the final encoder. Frames are
+    rendered `jobs` at a time (NumPy releases the GIL for the heavy work) and
+    written in order.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for i, image_path in enumerate(images):
+            src = load_image(image_path, height)
+            alphas = clip_alphas(duration, fps)
+            # Like build_filter_chain: every clip but the last fades in, every clip but the first fades out
+            fade_in = i == 0 or i < len(images) - 1
+            gains = fade_gains(len(alphas), fps, duration, fade_duration, fade_in, i > 0)
+
+            def render(k):
+                return render_frame(src, alphas[k], width, height, gains[k])
+
+            # A couple of frames per worker in flight keeps memory flat
+            for start in range(0, len(alphas), jobs * 2):
+                for frame in pool.map(render, range(start, min(start + jobs * 2, len(alphas)))):
+                    output.write(frame.tobytes())
+
+def render_ken_burns_clip(image_path, output_path, duration, width=1080, height=1920, fps=30,
+                          preset="fast", crf=18, pix_fmt="yuv420p"):
+    """Render the Ken Burns clip in-process, streaming raw frames to ffmpeg"""
+    src = load_image(image_path, height)
+    alphas = clip_alphas(duration, fps)
+    frame_count = len(alphas)
+
+    cmd = [
+        FFMPEG, "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        "-s", f"{width}x{height}", "-r", str(fps),
+        "-i", "-",
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-crf", str(crf),
+        "-pix_fmt", pix_fmt,
+        output_path
+    ]
+    # stderr goes to a file so a chatty encoder can never block the pipe
+    with tempfile.TemporaryFile() as stderr_file:
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr_file)
+        try:
+            for alpha in alphas:
+                proc.stdin.write(render_frame(src, alpha, width, height).tobytes())
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = wait_process(proc, f"ffmpeg {os.path.basename(output_path)}", started, frames=frame_count)
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed while encoding {output_path}:\n{read_stderr_tail(stderr_file)}")
+    return output_path
+
+def measure_psnr(reference_path, test_path):
+    """Average PSNR (dB) of test_path against reference_path, via ffmpeg"""
+    cmd = [
+        FFMPEG, "-i", test_path, "-i", reference_path,
+        "-lavfi", "[0:v][1:v]scale2ref[a][b];[a][b]psnr", "-f", "null", "-"
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    for line in result.stderr.splitlines():
+        if "PSNR" in line and "average:" in line:
+            return float(line.split("average:")[1].split()[0])
+    raise RuntimeError(f"Could not measure PSNR between {reference_path} and {test_path}")
+
+def compare_with_manim(image_path, duration, work_dir, profile=None):
+    """Render one image with both backends and report speed and similarity.
+
+    Needs Manim installed. No PSNR against Manim has been recorded yet;
+    compare_with_zoompan is the check that has been run.
+    """
+    import make_video
+    from render_profiles import get_profile
+
+    profile = get_profile(profile)
+
+    template_path = make_video.pathlib.Path(make_video.__file__).parent / "ken_burns.py"
+    with open(template_path, 'r') as f:
+        template_content = f.read()
+
+    start = time.perf_counter()
+    manim_clip = make_video.render_manim_clip(0, image_path, duration, work_dir, template_content, profile)
+    manim_seconds = time.perf_counter() - start
+
+    numpy_clip = os.path.join(work_dir, "numpy_clip.mp4")
+    start = time.perf_counter()
+    render_ken_burns_clip(image_path, numpy_clip, duration, profile.width, profile.height, profile.fps,
+                          profile.preset, profile.crf, profile.pix_fmt)
+    numpy_seconds = time.perf_counter() - start
+
+    psnr = measure_psnr(manim_clip, numpy_clip)
+    print(f"Manim: {manim_seconds:.2f}s")
+    print(f"NumPy: {numpy_seconds:.2f}s ({manim_seconds / numpy_seconds:.1f}x faster)")
+    print(f"PSNR vs Manim: {psnr:.2f} dB")
+    return {"manim_seconds": manim_seconds, "numpy_seconds": numpy_seconds, "psnr": psnr}
+
+def compare_with_zoompan(image_path, duration, work_dir, profile=None):
+    """Render one image here and with make_video's zoompan graph; report speed and similarity.
+
+    Both follow the motion of ken_burns.py, so this checks the NumPy
+    backend where Manim can't run. The zoompan clip is what --single-pass
+    renders.
+    """
+    import make_video
+    from render_profiles import encoder_args, get_profile
+
+    profile = get_profile(profile)
+
+    zoompan_clip = os.path.join(work_dir, "zoompan_clip.mp4")
+    start = time.perf_counter()
+    subprocess.run([
+        FFMPEG, "-y", "-loglevel", "error",
+        "-loop", "1", "-framerate", str(profile.fps), "-t", str(duration), "-i", image_path,
+        "-vf", make_video.build_zoompan_filter(duration, profile),
+    ] + encoder_args(profile) + [zoompan_clip], check=True)
+    zoompan_seconds = time.perf_counter() - start
+
+    numpy_clip = os.path.join(work_dir, "numpy_clip.mp4")
+    start = time.perf_counter()
+    render_ken_burns_clip(image_path, numpy_clip, duration, profile.width, profile.height, profile.fps,
+                          profile.preset, profile.crf, profile.pix_fmt)
+    numpy_seconds = time.perf_counter() - start
+
+    psnr = measure_psnr(zoompan_clip, numpy_clip)
+    print(f"zoompan: {zoompan_seconds:.2f}s")
+    print(f"NumPy: {numpy_seconds:.2f}s ({zoompan_seconds / numpy_seconds:.1f}x faster)")
+    print(f"PSNR vs zoompan: {psnr:.2f} dB")
+    return {"zoompan_seconds": zoompan_seconds, "numpy_seconds": numpy_seconds, "psnr": psnr}
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render a Ken Burns clip without Manim")
+    parser.add_argument("image", help="Source image")
+    parser.add_argument("output", nargs='?', help="Output MP4 path")
+    parser.add_argument("--duration", type=float, default=5.0, help="Clip length in seconds")
+    parser.add_argument("--compare", action="store_true",
+                        help="Render with Manim too and report timings and PSNR")
+    parser.add_argument("--compare-zoompan", action="store_true",
+                        help="Render with the --single-pass zoompan graph too and report timings and PSNR")
+    parser.add_argument("--profile", help="Render profile for the comparisons (default: shorts)")
+
+    args = parser.parse_args()
+
+    if args.compare:
+        with tempfile.TemporaryDirectory() as work_dir:
+            compare_with_manim(args.image, args.duration, work_dir, args.profile)
+    elif args.compare_zoompan:
+        with tempfile.TemporaryDirectory() as work_dir:
+            compare_with_zoompan(args.image, args.duration, work_dir, args.profile)
+    elif args.output:
+        render_ken_burns_clip(args.image, args.output, args.duration)
+    else:
+        parser.print_help()
@@ -0,0 +1,75 @@
+from collections import namedtuple
+
+# Output format of a render. Clips are produced at exactly this size and
+# frame rate, so the final encode never resamples or drops frames.
+RenderProfile = namedtuple("RenderProfile", ["name", "width", "height", "fps", "preset", "crf", "pix_fmt"])
+
+PROFILES = {
+    # Vertical 1080x1920 at 30 fps, what make_video.py has always delivered
+    "shorts": RenderProfile("shorts", 1080, 1920, 30, "fast", 18, "yuv420p"),
+    "shorts-60": RenderProfile("shorts-60", 1080, 1920, 60, "fast", 18, "yuv420p"),
+    "landscape": RenderProfile("landscape", 1920, 1080, 30, "fast", 18, "yuv420p"),
+    "draft": RenderProfile("draft", 540, 960, 30, "veryfast", 26, "yuv420p"),
+}
+
+DEFAULT_PROFILE = "shorts"
+
+# Smaller copies make_video.py --rendition encodes alongside the main video,
+# by the short side of the frame: (short side in pixels, preset, crf)
+RENDITIONS = {
+    "720p": (720, "fast", 20),
+    "480p": (480, "veryfast", 23),
+    "small": (360, "veryfast", 28),
+}
+
+def get_profile(profile=None):
+    """Look up a profile by name; a RenderProfile passes through and None means the default"""
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, RenderProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown render profile: {profile} (choose from {', '.join(sorted(PROFILES))})")
+    return PROFILES[profile]
+
+def preview_profile(profile, scale=3, fps=15):
+    """A fast, low-resolution variant of a profile for checking subtitle timing"""
+    # libx264 with yuv420p needs even dimensions
+    width = max(2, round(profile.width / scale / 2) * 2)
+    height = max(2, round(profile.height / scale / 2) * 2)
+    return RenderProfile(f"{profile.name}-preview", width, height, fps, "ultrafast", 30, "yuv420p")
+
+def rendition_profile(profile, name):
+    """Profile of a rendition of `profile`: a RENDITIONS name, or e.g. '540p' with the profile's encoder settings"""
+    if name in RENDITIONS:
+        short_side, preset, crf = RENDITIONS[name]
+    elif name.endswith("p") and name[:-1].isdigit():
+        short_side, preset, crf = int(name[:-1]), profile.preset, profile.crf
+    else:
+        raise ValueError(f"Unknown rendition: {name} (choose from {', '.join(RENDITIONS)}, or e.g. 540p)")
+    scale = short_side / min(profile.width, profile.height)
+    if scale > 1:
+        raise ValueError(f"Rendition {name} is larger than the {profile.name} profile it is scaled from")
+    # libx264 with yuv420p needs even dimensions
+    width = max(2, round(profile.width * scale / 2) * 2)
+    height = max(2, round(profile.height * scale / 2) * 2)
+    return RenderProfile(f"{profile.name}-{name}", width, height, profile.fps, preset, crf, profile.pix_fmt)
+
+def lossless_profile(profile):
+    """Variant of a profile for intermediate clips: lossless H.264 at the fastest preset.
+
+    The clips are decoded once more by the final encode, so lossless avoids
+    a second generation of compression loss. The files are much larger but
+    quicker to write than the profile's own settings.
+    """
+    return profile._replace(name=f"{profile.name}-lossless", preset="ultrafast", crf=0)
+
+def encoder_args(profile):
+    """libx264 output arguments for a profile"""
+    return [
+        "-c:v", "libx264",
+        "-preset", profile.preset,
+        "-r", str(profile.fps),
+        "-crf", str(profile.crf),
+        "-pix_fmt", profile.pix_fmt,
+    ]
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import instrument
+from clip_cache import hash_file
+from instrument import run_command
+
+FFMPEG = "/opt/homebrew/bin/ffmpeg"
+
+# Bump when the segment filter graph changes so old segments are re-encoded
+SEGMENT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+def parse_ass_time(value):
+    """Parse an ASS H:MM:SS.cc timestamp into seconds"""
+    h, m, s = value.split(':')
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+def read_ass_events(ass_path):
+    """Split an ASS file into its header and (start, end, line) dialogue events"""
+    with open(ass_path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+
+    header = []
+    events = []
+    for line in lines:
+        match = re.match(r'Dialogue:\s*[^,]*,([^,]+),([^,]+),', line)
+        if match:
+            events.append((parse_ass_time(match.group(1)), parse_ass_time(match.group(2)), line))
+        else:
+            header.append(line)
+    return "\n".join(header), events
+
+def plan_segments(count, per_image_duration, fps=30):
+    """(first frame, frame count) of each image's segment on the shared timeline.
+
+    Frame boundaries are rounded from the exact image start times, so the
+    segments add up to the full timeline without drifting from the audio.
+    """
+    boundaries = [round(i * per_image_duration * fps) for i in range(count + 1)]
+    return [(boundaries[i], boundaries[i + 1] - boundaries[i]) for i in range(count)]
+
+def build_segment_filter(index, count, per_image_duration, start_frame, frame_count, ass_path,
+                         fade_duration, fps=30, motion=""):
+    """Filter graph for one segment: the clip's fades, then subtitles at its timeline offset.
+
+    Fades stay inside each image exactly as in build_filter_chain, so
+    segment boundaries need no cross-segment state. The timestamps are
+    shifted to the segment's place on the timeline while the ASS filter runs,
+    then reset to zero for the segment file.
+    """
+    fade_in = f"fade=t=in:st=0:d={fade_duration}"
+    fade_out = f"fade=t=out:st={per_image_duration - fade_duration}:d={fade_duration}"
+    # Same rule as build_filter_chain: the first image only fades in, the
+    # last only fades out, the ones in between do both
+    if index == 0:
+        fades = [fade_in]
+    elif index == count - 1:
+        fades = [fade_out]
+    else:
+        fades = [fade_in, fade_out]
+    offset = start_frame / fps
+    chain = [
+        f"{motion}fps={fps}",
+        "setpts=PTS-STARTPTS",
+        # Repeat the last frame if the clip is a frame short of its slot
+        "tpad=stop_mode=clone:stop_duration=1",
+        *fades,
+        f"setpts=PTS+{offset}/TB",
+        f"ass={ass_path}",
+        "setpts=PTS-STARTPTS",
+        "format=yuv420p",
+    ]
+    return f"[0:v]{','.join(chain)}[v]"
+
+def segment_fingerprint(source_hash, filter_graph, frame_count, ass_header, events, encoder_args):
+    """Everything that can change a segment's pixels, hashed"""
+    payload = json.dumps({
+        "version": SEGMENT_VERSION,
+        "source": source_hash,
+        # The ASS path is irrelevant; its content is covered by header/events
+        "filter": re.sub(r'ass=[^,\]]*', 'ass', filter_graph),
+        "frames": frame_count,
+        "ass_header": ass_header,
+        "events": events,
+        "encoder": encoder_args,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def encode_segment(input_args, filter_graph, frame_count, encoder_args, output_path):
+    cmd = [FFMPEG, "-y"] + input_args + [
+        "-filter_complex", filter_graph,
+        "-map", "[v]",
+        "-frames:v", str(frame_count),
+    ] + encoder_args + [output_path]
+    run_command(cmd, f"Segment {os.path.basename(output_path)}", frame_count)
+    return output_path
+
+def concat_segments(segment_paths, audio_path, output_path, segment_dir):
+    """Join segments with a stream-copy concat and mux in the audio"""
+    list_path = os.path.join(segment_dir, "segments.txt")
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    cmd = [
+        FFMPEG, "-y",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-i", audio_path,
+        "-map", "0:v",
+        "-map", "1:a",
+        "-c:v", "copy",
+        "-shortest",
+        output_path
+    ]
+    run_command(cmd, "Joining segments")
+
+class SegmentedEncoder:
+    """Encodes the timeline segment by segment, in any order, then joins them.
+
+    Segments can be submitted as soon as their source exists (see
+    make_video.render_pipelined), or all at once by encode_segmented.
+    Segment fingerprints are kept in segment_dir/manifest.json, so after a
+    subtitle edit only segments whose ASS events changed are re-encoded.
+    `sources` are clips, or still images when image_inputs is set (the Ken
+    Burns `motion` filter is then applied per segment).
+    """
+
+    def __init__(self, count, per_image_duration, ass_path, segment_dir, fade_duration, fps=30,
+                 encoder_args=None, image_inputs=False, motion=""):
+        if encoder_args is None:
+            encoder_args = ["-c:v", "libx264", "-preset", "fast", "-r", str(fps), "-crf", "18"]
+        self.count = count
+        self.per_image_duration = per_image_duration
+        self.ass_path = ass_path
+        self.segment_dir = segment_dir
+        self.fade_duration = fade_duration
+        self.fps = fps
+        self.encoder_args = encoder_args
+        self.image_inputs = image_inputs
+        self.motion = motion
+
+        os.makedirs(segment_dir, exist_ok=True)
+        self.manifest_path = os.path.join(segment_dir, MANIFEST_NAME)
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.previous = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.previous = {}
+
+        self.ass_header, self.events = read_ass_events(ass_path)
+        self.plan = plan_segments(count, per_image_duration, fps)
+        self.segment_paths = [os.path.join(segment_dir, f"segment_{i:05d}.mp4") for i in range(count)]
+        self.fingerprints = {}
+        self.reused = 0
+
+    def encode(self, i, source):
+        """Encode segment i from its source unless an identical one exists. Returns True if it encoded."""
+        start_frame, frame_count = self.plan[i]
+        segment_path = self.segment_paths[i]
+        start = start_frame / self.fps
+        end = (start_frame + frame_count) / self.fps
+        overlapping = [line for event_start, event_end, line in self.events
+                       if event_start < end and event_end > start]
+        filter_graph = build_segment_filter(i, self.count, self.per_image_duration, start_frame, frame_count,
+                                            self.ass_path, self.fade_duration, self.fps, self.motion)
+        if self.image_inputs:
+            input_args = ["-loop", "1", "-framerate", str(self.fps), "-t", str(self.per_image_duration),
+                          "-i", source]
+        else:
+            input_args = ["-i", source]
+        fingerprint = segment_fingerprint(hash_file(source), filter_graph, frame_count,
+                                          self.ass_header, overlapping, self.encoder_args)
+        if self.previous.get(os.path.basename(segment_path)) == fingerprint and os.path.exists(segment_path):
+            self.fingerprints[segment_path] = fingerprint
+            self.reused += 1
+            return False
+        encode_segment(input_args, filter_graph, frame_count, self.encoder_args, segment_path)
+        self.fingerprints[segment_path] = fingerprint
+        return True
+
+    def finish(self, audio_path, output_path, errors=()):
+        """Record finished segments, then join them with the audio or raise the collected errors"""
+        # Record fingerprints for every segment that is up to date, so finished
+        # segments are reused even if this run failed
+        manifest = {os.path.basename(path): fingerprint for path, fingerprint in self.fingerprints.items()}
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        if errors:
+            raise RuntimeError(f"{len(errors)} segments failed to encode:\n" + "\n".join(sorted(errors)))
+
+        # Drop segments left over from a run with more images
+        keep = {os.path.basename(path) for path in self.segment_paths}
+        for name in os.listdir(self.segment_dir):
+            if name.startswith("segment_") and name.endswith(".mp4") and name not in keep:
+                os.remove(os.path.join(self.segment_dir, name))
+
+        concat_segments(self.segment_paths, audio_path, output_path, self.segment_dir)
+
+def encode_segmented(sources, per_image_duration, audio_path, ass_path, output_path, segment_dir,
+                     fade_duration, jobs=None, fps=30, encoder_args=None, image_inputs=False, motion=""):
+    """Encode the timeline as one segment per image, in parallel, reusing unchanged segments"""
+    encoder = SegmentedEncoder(len(sources), per_image_duration, ass_path, segment_dir, fade_duration, fps,
+                               encoder_args, image_inputs, motion)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    print(f"Encoding {len(sources)} segments (unchanged ones are reused)...")
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(sources)))) as pool, \
+            instrument.trace.bar(len(sources), "Segments", "segment") as bar:
+        futures = {pool.submit(encoder.encode, i, source): i for i, source in enumerate(sources)}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(str(e))
+            bar.update(1)
+    print(f"  {encoder.reused} of {len(sources)} segments unchanged")
+    encoder.finish(audio_path, output_path, errors)
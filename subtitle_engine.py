@@ -0,0 +1,247 @@
+import os
+from collections import namedtuple
+from itertools import chain
+
+# One recognized (or edited) word. Tuples keep multi-hour transcripts small.
+Word = namedtuple("Word", ["word", "start", "end"])
+
+ASS_HEADER = '''[Script Info]
+Title: Word Highlight Subtitles
+ScriptType: v4.00+
+WrapStyle: 1
+ScaledBorderAndShadow: yes
+YCbCr Matrix: TV.601
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Lava Devanagari,35,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,1,0,0,0,100,100,0,0,1,2,1,2,50,50,40,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+'''
+
+HIGHLIGHT_START = r'{\b1\c&H00FFFF&\3c&H000000&}'
+HIGHLIGHT_END = r'{\r}'
+
+SENTENCE_ENDINGS = ('.', '।', '!', '?', ':')
+PAUSE_SECONDS = 0.5
+
+def format_time_ass(seconds):
+    # Truncated to centiseconds from whole milliseconds, so a time read back
+    # from the TXT file (format_time_readable) gives the same timestamp
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h}:{m:02}:{s:02}.{ms // 10:02}"
+
+def format_time_readable(seconds):
+    m, ms = divmod(int(round(seconds * 1000)), 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{m:02}:{s:02}.{ms:03}"
+
+def format_time_srt(seconds, separator=','):
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02}:{m:02}:{s:02}{separator}{ms:03}"
+
+def to_word(word):
+    """Accept a Word, a Vosk result dict or a [word, start, end] list"""
+    if isinstance(word, Word):
+        return word
+    if isinstance(word, dict):
+        return Word(word['word'], word['start'], word['end'])
+    return Word(*word)
+
+def is_sentence_end(word):
+    # Check if word ends a sentence (has punctuation)
+    return to_word(word).word.strip().endswith(SENTENCE_ENDINGS)
+
+def iter_phrase_chunks(words, max_words_per_chunk=4, pause=PAUSE_SECONDS):
+    """Group a stream of words into phrases, yielding each phrase as soon as it closes.
+
+    A phrase ends after a word when it reaches max_words_per_chunk, when the
+    word ends a sentence, or when the word came after a gap longer than
+    `pause`.
+    """
+    current_chunk = []
+    for word in words:
+        word = to_word(word)
+        current_chunk.append(word)
+
+        # Break chunk if:
+        # 1. We've reached max words
+        # 2. Word ends a sentence
+        # 3. There's a significant pause (gap > pause)
+        if (len(current_chunk) >= max_words_per_chunk
+                or is_sentence_end(word)
+                or (len(current_chunk) > 1 and word.start - current_chunk[-2].end > pause)):
+            yield current_chunk
+            current_chunk = []
+    if current_chunk:
+        yield current_chunk
+
+def create_phrase_chunks(all_words, max_words_per_chunk=4, pause=PAUSE_SECONDS):
+    return list(iter_phrase_chunks(all_words, max_words_per_chunk, pause))
+
+class SubtitleWriter:
+    """Base class for streaming writers.
+
+    Output goes to a temporary file that replaces `path` only when the writer
+    closes cleanly, so a failed run never leaves a half-written file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self.events = 0
+        self.write_header()
+
+    def write_header(self):
+        pass
+
+    def write_chunk(self, chunk, next_start):
+        """Write one phrase. next_start is the next phrase's start, or None for the last."""
+        raise NotImplementedError
+
+    def close(self):
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+class AssWriter(SubtitleWriter):
+    """One Dialogue event per word, with the current word highlighted in its phrase"""
+
+    def write_header(self):
+        self._file.write(ASS_HEADER)
+        self._first = True
+
+    def write_chunk(self, chunk, next_start):
+        texts = [w.word for w in chunk]
+        starts = [format_time_ass(w.start) for w in chunk]
+        # Last word in the phrase: end when the next phrase starts, or when
+        # the word itself ends if this is the last phrase
+        last_end = format_time_ass(next_start if next_start is not None else chunk[-1].end)
+        lines = []
+        for i in range(len(chunk)):
+            # Build the phrase, highlighting only the current word
+            text = ' '.join(texts[:i] + [HIGHLIGHT_START + texts[i] + HIGHLIGHT_END] + texts[i + 1:])
+            end_time = starts[i + 1] if i < len(chunk) - 1 else last_end
+            lines.append(f"Dialogue: 0,{starts[i]},{end_time},Default,,0,0,0,,{text}")
+        if not self._first:
+            self._file.write('\n')
+        self._file.write('\n'.join(lines))
+        self._first = False
+        self.events += len(lines)
+
+class SrtWriter(SubtitleWriter):
+    """One cue per phrase, lasting until the next phrase starts"""
+
+    separator = ','
+
+    def cue_header(self, index):
+        return f"{index}\n"
+
+    def write_chunk(self, chunk, next_start):
+        end = next_start if next_start is not None else chunk[-1].end
+        self.events += 1
+        self._file.write(
+            f"{self.cue_header(self.events)}"
+            f"{format_time_srt(chunk[0].start, self.separator)} --> {format_time_srt(end, self.separator)}\n"
+            f"{' '.join(w.word for w in chunk)}\n\n"
+        )
+
+class VttWriter(SrtWriter):
+    separator = '.'
+
+    def write_header(self):
+        self._file.write("WEBVTT\n\n")
+
+    def cue_header(self, index):
+        return ""
+
+class TxtWriter(SubtitleWriter):
+    """Human-readable transcript with timing, the format parse_edited_subtitles reads back"""
+
+    def write_header(self):
+        f = self._file
+        f.write("SUBTITLE TRANSCRIPT WITH TIMING\n")
+        f.write("=" * 50 + "\n\n")
+        f.write("INSTRUCTIONS FOR EDITING:\n")
+        f.write("- Edit the 'Text:' lines to change subtitle content\n")
+        f.write("- Keep the timing format: [MM:SS.mmm - MM:SS.mmm]\n")
+        f.write("- Words keep their listed times while a phrase has the same number of words\n")
+        f.write("- After editing, run: python generate_subs.py --regenerate-from-txt\n")
+        f.write("=" * 50 + "\n\n")
+
+    def write_chunk(self, chunk, next_start):
+        f = self._file
+        self.events += 1
+        phrase_text = ' '.join(w.word for w in chunk)
+
+        # Get timing for the phrase
+        start_time = format_time_readable(chunk[0].start)
+        end_time = format_time_readable(chunk[-1].end)
+
+        f.write(f"Phrase {self.events}: [{start_time} - {end_time}]\n")
+        f.write(f"Text: {phrase_text}\n")
+        f.write("-" * 30 + "\n")
+
+        # Show individual words with timing
+        for i, word in enumerate(chunk):
+            word_start = format_time_readable(word.start)
+            word_end = format_time_readable(word.end)
+            f.write(f"  Word {i+1}: [{word_start}-{word_end}] {word.word}\n")
+        f.write("\n")
+
+WRITERS = {
+    "ass": AssWriter,
+    "srt": SrtWriter,
+    "vtt": VttWriter,
+    "txt": TxtWriter,
+}
+
+def write_chunks(chunks, outputs):
+    """Stream phrases into every requested output.
+
+    `outputs` maps a format name from WRITERS to its path. Only one phrase of
+    lookahead is held in memory (its start closes the previous phrase).
+    Returns the number of events written per format.
+    """
+    writers = [WRITERS[fmt](path) for fmt, path in outputs.items()]
+    try:
+        previous = None
+        for chunk in chunks:
+            if previous is not None:
+                for writer in writers:
+                    writer.write_chunk(previous, chunk[0].start)
+            previous = chunk
+        if previous is not None:
+            for writer in writers:
+                writer.write_chunk(previous, None)
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+    for writer in writers:
+        writer.close()
+    return {fmt: writer.events for fmt, writer in zip(outputs, writers)}
+
+def write_subtitles(words, outputs, max_words_per_chunk=4, pause=PAUSE_SECONDS):
+    """Chunk a stream of words into phrases and write them to every output"""
+    return write_chunks(iter_phrase_chunks(words, max_words_per_chunk, pause), outputs)
+
+def peek(iterable):
+    """Return (first item or None, iterator over all items)"""
+    iterator = iter(iterable)
+    first = next(iterator, None)
+    if first is None:
+        return None, iter(())
+    return first, chain([first], iterator)
@@ -0,0 +1,97 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from vosk import Model
+from generate_subs import transcribe_words, DEFAULT_MODEL_PATH, DEFAULT_SOCKET_PATH
+
+# Loaded Vosk models by absolute path, shared by every request
+_models = {}
+_models_lock = threading.Lock()
+
+def get_model(model_path):
+    """Load a model the first time it is requested and keep it in memory"""
+    with _models_lock:
+        if model_path not in _models:
+            print(f"📦 Loading Vosk model: {model_path}")
+            start = time.perf_counter()
+            _models[model_path] = Model(model_path)
+            print(f"✅ Model loaded in {time.perf_counter() - start:.1f}s")
+        return _models[model_path]
+
+class TranscriptionHandler(socketserver.StreamRequestHandler):
+    """Handle one job: a JSON request line in, a JSON response line out"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            audio_path = request["audio_path"]
+            model = get_model(request.get("model_path", DEFAULT_MODEL_PATH))
+            print(f"🎙️  Transcribing {audio_path}")
+            start = time.perf_counter()
+            # The client prints how much silence was skipped
+            silence = {}
+            words = list(transcribe_words(audio_path, None, request.get("workers", 1), model=model,
+                                          skip_silence=request.get("skip_silence", True), stats=silence))
+            print(f"✅ {len(words)} words from {audio_path} in {time.perf_counter() - start:.1f}s")
+            response = {"words": words}
+            if silence:
+                response["silence"] = silence
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            response = {"error": str(e)}
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n")
+
+class TranscriptionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def remove_stale_socket(socket_path):
+    """Delete a socket file left behind by a server that is no longer running"""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except ConnectionRefusedError:
+        os.remove(socket_path)
+    else:
+        raise RuntimeError(f"A transcription server is already listening on {socket_path}")
+    finally:
+        probe.close()
+
+def serve(socket_path=DEFAULT_SOCKET_PATH, model_path=DEFAULT_MODEL_PATH):
+    """Load the model once, then serve transcription jobs until interrupted"""
+    remove_stale_socket(socket_path)
+    get_model(os.path.abspath(model_path))
+
+    server = TranscriptionServer(socket_path, TranscriptionHandler)
+    # SIGTERM should clean up the socket file just like Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"🔌 Listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        print("🧹 Transcription server stopped")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Keep a Vosk model loaded and serve transcription jobs over a Unix socket")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help=f"Socket path (default: {DEFAULT_SOCKET_PATH})")
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH, help="Vosk model to preload")
+
+    args = parser.parse_args()
+    serve(args.socket, args.model_path)
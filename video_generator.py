@@ -1,5 +1,6 @@
 import os
 import moviepy
+from glitter_overlay import add_glitter
 
 # SETTINGS
 images_folder = "images"
@@ -40,9 +41,14 @@ final = moviepy.concatenate_videoclips(clips, method="compose", padding=-0.5)
 # Add audio
 final = final.with_audio(audio_clip)
 
-# Add glitter overlay
-glitter = moviepy.VideoFileClip(glitter_file).resized(final.size).with_duration(final.duration)
-final = moviepy.CompositeVideoClip([final, glitter])
-
-# Export
-final.write_videofile(output_file, fps=24) 
\ No newline at end of file
+# Export without the overlay first; compositing it in MoviePy is slow and memory-hungry
+if os.path.exists(glitter_file):
+    base_file = os.path.splitext(output_file)[0] + "_base.mp4"
+    final.write_videofile(base_file, fps=24)
+
+    # Add glitter overlay with ffmpeg (pre-scaled loop, screen blend)
+    width, height = final.size
+    add_glitter(base_file, glitter_file, output_file, width, height, 24)
+    os.remove(base_file)
+else:
+    final.write_videofile(output_file, fps=24) 
\ No newline at end of file